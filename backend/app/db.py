@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
+import hashlib
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 
 # ------------------------------------------------------------
 # Database URL handling
@@ -30,13 +32,56 @@ _connect_args = {}
 if DB_URL.startswith("sqlite"):
     _connect_args = {"check_same_thread": False}
 
+# Keep connections (and SQLite's per-connection page cache) alive across
+# requests instead of reconnecting. In-memory SQLite keeps SQLAlchemy's
+# default pool, since every new connection would be a fresh empty DB.
+_pool_kwargs = {}
+if ":memory:" not in DB_URL:
+    _pool_kwargs = {
+        "poolclass": QueuePool,
+        # Sync routes run on AnyIO's 40-thread pool and each holds its session's
+        # connection until the response is sent; size the pool so every thread
+        # can get one instead of waiting out pool_timeout.
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "40")),
+        # Replace connections older than this (seconds) so server-side idle
+        # timeouts never hand a route a dead connection; pre-ping catches the rest.
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
 engine = create_engine(
     DB_URL,
     future=True,
     echo=False,
     connect_args=_connect_args,
+    **_pool_kwargs,
+)
+
+# Per-connection SQLite tuning:
+# - WAL lets readers (FastAPI) run concurrently with the writer (worker)
+# - synchronous=NORMAL is durable under WAL and avoids an fsync per commit
+# - busy_timeout waits for the write lock instead of failing with SQLITE_BUSY
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",  # ~64MB page cache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
 )
 
+if DB_URL.startswith("sqlite"):
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in _SQLITE_PRAGMAS:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
 SessionLocal = sessionmaker(
     bind=engine,
     autocommit=False,
@@ -51,16 +96,260 @@ Base = declarative_base()
 # Database initialization
 # ------------------------------------------------------------
 
+def _schema_hash() -> str:
+    """Fingerprint of the declared tables, columns and indexes."""
+    parts = []
+    for t in Base.metadata.sorted_tables:
+        cols = tuple(c.name for c in t.columns)
+        idxs = tuple(sorted(i.name or "" for i in t.indexes))
+        parts.append((t.name, cols, idxs))
+    if DB_URL.startswith("sqlite"):
+        parts.append(_SEGMENT_FTS_DDL)
+    elif DB_URL.startswith("postgresql"):
+        parts.append((_TRIGRAM_INDEXES, _SEGMENT_TSV_INDEX))
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------------
+# Segment text search (SQLite FTS5)
+# ------------------------------------------------------------
+
+# Trigram FTS5 index over artifact_text_segments.text. External content (no
+# second copy of the text), kept in sync by triggers, so every writer --
+# ORM, bulk insert, upsert, bulk delete -- is covered. A trigram index serves
+# LIKE '%...%' directly, so substring search keeps its exact semantics.
+SEGMENT_FTS_TABLE = "artifact_text_segments_fts"
+
+_SEGMENT_FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEGMENT_FTS_TABLE} USING fts5(
+        text, content='artifact_text_segments', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEGMENT_FTS_TABLE}_ai
+        AFTER INSERT ON artifact_text_segments BEGIN
+            INSERT INTO {SEGMENT_FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEGMENT_FTS_TABLE}_ad
+        AFTER DELETE ON artifact_text_segments BEGIN
+            INSERT INTO {SEGMENT_FTS_TABLE}({SEGMENT_FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEGMENT_FTS_TABLE}_au
+        AFTER UPDATE ON artifact_text_segments BEGIN
+            INSERT INTO {SEGMENT_FTS_TABLE}({SEGMENT_FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {SEGMENT_FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+)
+
+_segment_fts: bool | None = None
+
+
+def _ensure_segment_fts() -> None:
+    global _segment_fts
+    if not DB_URL.startswith("sqlite"):
+        return
+    try:
+        with engine.begin() as conn:
+            existed = _fts_table_exists(conn)
+            for ddl in _SEGMENT_FTS_DDL:
+                conn.execute(text(ddl))
+            if not existed:
+                # Index the segments written before the FTS table existed
+                conn.execute(
+                    text(f"INSERT INTO {SEGMENT_FTS_TABLE}({SEGMENT_FTS_TABLE}) VALUES ('rebuild')")
+                )
+    except Exception:
+        # SQLite built without FTS5 / trigram tokenizer (< 3.34): plain LIKE scans
+        _segment_fts = False
+        return
+    _segment_fts = True
+
+
+def _fts_table_exists(conn) -> bool:
+    return (
+        conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"),
+            {"n": SEGMENT_FTS_TABLE},
+        ).first()
+        is not None
+    )
+
+
+def segment_fts_available() -> bool:
+    """True if the trigram FTS index over segment text exists in this DB."""
+    global _segment_fts
+    if _segment_fts is None:
+        if not DB_URL.startswith("sqlite"):
+            _segment_fts = False
+        else:
+            with engine.connect() as conn:
+                _segment_fts = _fts_table_exists(conn)
+    return _segment_fts
+
+
+# ------------------------------------------------------------
+# Search indexes (PostgreSQL pg_trgm + full text)
+# ------------------------------------------------------------
+
+# The UI/API searches use ILIKE '%q%', which no B-tree can serve. On
+# PostgreSQL a GIN trigram index on the raw column is picked up for ILIKE
+# directly, so the queries stay as they are. (SQLite covers segment text
+# with the FTS5 table above.)
+_TRIGRAM_INDEXES = (
+    ("ix_artifacts_original_filename_trgm", "artifacts", "original_filename"),
+    ("ix_artifacts_text_content_trgm", "artifacts", "text_content"),
+    ("ix_claims_field_key_trgm", "claims", "field_key"),
+    ("ix_claims_value_json_trgm", "claims", "value_json"),
+    ("ix_artifact_text_segments_text_trgm", "artifact_text_segments", "text"),
+)
+
+# Word search (search mode "nl") over segment text. An expression index rather
+# than a stored tsvector column, so the model stays the same on every backend;
+# queries must use this exact expression to hit it.
+SEGMENT_TSV_CONFIG = "english"
+_SEGMENT_TSV_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ix_artifact_text_segments_text_tsv ON artifact_text_segments "
+    f"USING gin (to_tsvector('{SEGMENT_TSV_CONFIG}', text))"
+)
+
+
+def _ensure_pg_search_indexes() -> None:
+    if not DB_URL.startswith("postgresql"):
+        return
+    with engine.begin() as conn:
+        conn.execute(text(_SEGMENT_TSV_INDEX))
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for name, table, column in _TRIGRAM_INDEXES:
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+                        f"USING gin ({column} gin_trgm_ops)"
+                    )
+                )
+    except Exception as e:
+        # Extension not installed / no privilege to create it: ILIKE still works, unindexed
+        print("[db] pg_trgm indexes skipped:", e)
+
+
 def init_db() -> None:
     """
     Initialize database tables.
 
-    Safe to call multiple times.
+    Safe to call multiple times. If the DB was already initialized for the
+    current models (schema hash stored in app_meta), this is a single SELECT.
     """
     # Import models here so they are registered with SQLAlchemy
     from backend.app import models  # noqa: F401
 
+    schema_hash = _schema_hash()
+    with engine.begin() as conn:
+        conn.execute(
+            text("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        )
+        current = conn.execute(
+            text("SELECT value FROM app_meta WHERE key = 'schema_hash'")
+        ).scalar()
+    if current == schema_hash:
+        return
+
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _ensure_segment_fts()
+    _ensure_pg_search_indexes()
+
+    # create_all() skips tables that already exist, so indexes added to a
+    # model later would never reach an older database file.
+    existing = _existing_index_names()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM app_meta WHERE key = 'schema_hash'"))
+        conn.execute(
+            text("INSERT INTO app_meta (key, value) VALUES ('schema_hash', :h)"),
+            {"h": schema_hash},
+        )
+
+
+def _existing_index_names() -> set[str]:
+    # Inspector.get_indexes() skips expression indexes (e.g. lower(kind)) on
+    # SQLite, so read the names straight from sqlite_master there.
+    if DB_URL.startswith("sqlite"):
+        with engine.connect() as conn:
+            return set(
+                conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars()
+            )
+
+    from sqlalchemy import inspect
+
+    insp = inspect(engine)
+    return {
+        i["name"]
+        for table_name in insp.get_table_names()
+        for i in insp.get_indexes(table_name)
+        if i.get("name")
+    }
+
+
+def _add_missing_columns() -> None:
+    """
+    create_all() never alters existing tables, so nullable columns added to
+    a model later are appended here with ALTER TABLE ... ADD COLUMN.
+    """
+    from sqlalchemy import inspect
+
+    insp = inspect(engine)
+    existing_tables = set(insp.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in have or not col.nullable:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col_type}'))
+
+
+# ------------------------------------------------------------
+# Upserts
+# ------------------------------------------------------------
+
+def upsert_insert(db, model):
+    """
+    INSERT construct for `model` with .on_conflict_do_update()/.excluded, from
+    the dialect the session is bound to (SQLite and PostgreSQL share that API,
+    but a statement built for one does not compile on the other).
+    """
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"no upsert support for dialect {name!r}")
+    return insert(model)
+
+
+# ------------------------------------------------------------
+# WAL maintenance
+# ------------------------------------------------------------
+
+def checkpoint(db, mode: str = "PASSIVE") -> None:
+    """
+    Fold the SQLite WAL back into the main DB file.
+
+    PASSIVE never blocks readers/writers; TRUNCATE also resets the -wal file
+    to zero bytes. No-op on non-SQLite databases.
+    """
+    if not DB_URL.startswith("sqlite"):
+        return
+    db.execute(text(f"PRAGMA wal_checkpoint({mode})"))
 
 
 # ------------------------------------------------------------
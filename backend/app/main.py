@@ -6,11 +6,11 @@ from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 
 from backend.app.db import init_db
+from backend.app.templating import templates  # noqa: F401  (shared Jinja2 env)
 
 # For worker processing of jobs
 import subprocess
@@ -49,7 +49,10 @@ async def lifespan(app: FastAPI):
                 ],
                 stdout=None,   # show worker logs
                 stderr=None,
-                env=os.environ.copy(),
+                # Inherit env and skip close_fds so CPython launches via
+                # posix_spawn instead of fork+exec (fds are non-inheritable
+                # by default since PEP 446, so nothing leaks to the worker).
+                close_fds=False,
             )
 
         try:
@@ -73,9 +76,6 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Templates
-templates = Jinja2Templates(directory="backend/app/templates")
-
 # ---- Ensure local storage dirs exist ----
 uploads_dir = Path("data/uploads")
 uploads_dir.mkdir(parents=True, exist_ok=True)
@@ -86,13 +86,32 @@ artifacts_dir.mkdir(parents=True, exist_ok=True)
 static_dir = Path("backend/app/static")
 static_dir.mkdir(parents=True, exist_ok=True)
 
+# Read size for media downloads; Starlette's default (64 KiB) costs one thread
+# hop and one ASGI message per chunk, which adds up on multi-MB PDFs/audio.
+MEDIA_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles for uploaded media. Same FileResponse (which hands the path to
+    the server for sendfile when it supports the ASGI pathsend extension),
+    just streamed in larger chunks otherwise.
+    """
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        if isinstance(response, FileResponse):
+            response.chunk_size = MEDIA_CHUNK_SIZE
+        return response
+
+
 # ---- Static mounts ----
 # IMPORTANT:
 # - /uploads is for observation media (legacy)
 # - /artifact-files is for the new generalized artifact store
 # We must NOT mount StaticFiles on /artifacts because /artifacts is the API router prefix.
-app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
-app.mount("/artifact-files", StaticFiles(directory=str(artifacts_dir)), name="artifact-files")
+app.mount("/uploads", MediaFiles(directory=str(uploads_dir)), name="uploads")
+app.mount("/artifact-files", MediaFiles(directory=str(artifacts_dir)), name="artifact-files")
 app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 # ---- CORS (MVP-friendly) ----
@@ -4,7 +4,7 @@ from __future__ import annotations
 import datetime as dt
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, Float
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, Float, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.app.db import Base
@@ -31,6 +31,21 @@ class BuildingScoreCache(Base):
     building = relationship("Building")
 
 
+class ExtractedTextCache(Base):
+    """
+    Extracted text segments keyed by the source file's sha256, so identical
+    bytes (retries, re-uploads) skip OCR / transcription.
+    """
+    __tablename__ = "extracted_text_cache"
+
+    file_sha256 = Column(String(64), primary_key=True)
+    extractor = Column(String(80), primary_key=True)  # e.g. "pdf:v2:<config digest>", "audio:small:auto"
+
+    segments_json = Column(Text, nullable=False)  # [[segment_index, source_ref, text], ...]
+
+    updated_at = Column(DateTime, nullable=False, default=dt.datetime.utcnow)
+
+
 class BuildingScore(Base):
     __tablename__ = "building_scores"
     __table_args__ = (
@@ -93,6 +108,12 @@ class Building(Base):
 class Artifact(Base):
     """Generic evidence object (upload anything)."""
     __tablename__ = "artifacts"
+    __table_args__ = (
+        # building_id / industrial_park_id IN (...) filters, GROUP BY counts and
+        # "latest artifact" lookups in export + review pages
+        Index("ix_artifacts_building_created", "building_id", "created_at"),
+        Index("ix_artifacts_park_created", "industrial_park_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     
@@ -113,6 +134,13 @@ class Artifact(Base):
 
     text_content: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # Fingerprints of the last written segments / structured claims, so a
+    # re-run that produces identical output doesn't rewrite the rows.
+    last_extracted_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    last_claims_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Archives only: sha256 of the zip whose members have been created as artifacts
+    unpacked_sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
     status: Mapped[str] = mapped_column(String(30), nullable=False, default="uploaded")
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -127,6 +155,10 @@ class Artifact(Base):
     )
 
 
+# Kind is always compared case-insensitively (func.lower(kind) == "text")
+Index("ix_artifacts_kind_lower", func.lower(Artifact.kind))
+
+
 class ProcessingJob(Base):
     __tablename__ = "processing_jobs"
 
@@ -147,6 +179,15 @@ class ProcessingJob(Base):
 
 class ArtifactTextSegment(Base):
     __tablename__ = "artifact_text_segments"
+    __table_args__ = (
+        # One row per (artifact, segment); lets transcript writes use UPSERT
+        Index(
+            "uq_artifact_text_segments_artifact_segment",
+            "artifact_id",
+            "segment_index",
+            unique=True,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     artifact_id: Mapped[int] = mapped_column(ForeignKey("artifacts.id"), nullable=False)
@@ -160,6 +201,12 @@ class ArtifactTextSegment(Base):
 
 class Claim(Base):
     __tablename__ = "claims"
+    __table_args__ = (
+        # artifact_id lookups + "disc:%" prefix range scans on field_key
+        Index("ix_claims_artifact_field_key", "artifact_id", "field_key"),
+        # Per-building claim search ordered by confidence
+        Index("ix_claims_building_confidence", "building_id", "confidence"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     artifact_id: Mapped[int] = mapped_column(ForeignKey("artifacts.id"), nullable=False)
@@ -171,3 +218,5 @@ class Claim(Base):
     confidence: Mapped[float] = mapped_column(Float, nullable=False, default=0.5)
     source_ref: Mapped[str | None] = mapped_column(String(200), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    artifact: Mapped["Artifact"] = relationship("Artifact")
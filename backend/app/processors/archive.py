@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import logging
+import zipfile
+
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.services.ingest import create_file_artifacts, zip_member_sources
+from backend.app.services.storage import get_artifact_path, sha256_file
+
+log = logging.getLogger(__name__)
+
+
+def ingest_zip(db: Session, artifact: models.Artifact) -> None:
+    """
+    Unpack an uploaded zip into one file artifact per member (same park and
+    building), each queued for extract_text.
+    """
+    path = get_artifact_path(artifact)
+    zip_sha = artifact.sha256 or sha256_file(path)
+    if artifact.unpacked_sha256 == zip_sha:
+        return  # already unpacked; a re-run would duplicate the members
+
+    with zipfile.ZipFile(path) as zf:
+        sources = zip_member_sources(zf)
+        # Staged here so it commits together with the member rows (the first
+        # commit in create_file_artifacts): a retry sees either both or neither.
+        artifact.unpacked_sha256 = zip_sha
+        try:
+            ids = create_file_artifacts(db, artifact.industrial_park_id, artifact.building_id, sources)
+        except Exception:
+            db.rollback()
+            artifact.unpacked_sha256 = None
+            db.commit()
+            raise
+
+    log.info("ingest_zip artifact_id=%s members=%s", artifact.id, len(ids))
+    db.commit()  # no members: nothing above committed the marker
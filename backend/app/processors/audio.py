@@ -1,22 +1,33 @@
 from __future__ import annotations
 
+import functools
+import io
+import logging
 import os
 import shutil
 import subprocess
-import tempfile
 from pathlib import Path
 from typing import Optional
 
 from sqlalchemy.orm import Session
 
 from backend.app import models
+from backend.app.db import upsert_insert
+from backend.app.services import text_cache
 from backend.app.services.storage import get_artifact_path
 
 # Env-configurable defaults
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small")  # tiny/base/small/medium/large-v3
 WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")  # auto/cpu/cuda
-WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "auto")  # auto/int8/float16
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "auto")  # auto (int8 CPU / float16 GPU)/int8/float16
 WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE")  # e.g. "en" or None for auto-detect
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", str(os.cpu_count() or 4)))
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "1"))  # 1 = greedy decoding
+# Bump when a code change alters the transcript; cached transcripts from older
+# versions (or other model/decoding settings) are then ignored.
+AUDIO_EXTRACTOR_VERSION = 2
+
+log = logging.getLogger(__name__)
 
 
 def _ensure_ffmpeg() -> None:
@@ -26,14 +37,19 @@ def _ensure_ffmpeg() -> None:
         )
 
 
-def _extract_audio_to_wav(src: Path, dst_wav: Path) -> None:
+def _decode_audio_pcm(src: Path):
     """
-    Convert any audio/video file into 16kHz mono WAV for whisper.
+    Decode any audio/video file to 16kHz mono float32 samples for whisper.
+    ffmpeg writes raw s16le PCM to stdout, so nothing touches the disk.
     """
     _ensure_ffmpeg()
+    import numpy as np
+
     cmd = [
         "ffmpeg",
-        "-y",
+        "-nostdin",
+        "-loglevel",
+        "error",
         "-i",
         str(src),
         "-vn",                  # no video
@@ -42,99 +58,166 @@ def _extract_audio_to_wav(src: Path, dst_wav: Path) -> None:
         "-ar",
         "16000",                # 16kHz
         "-f",
-        "wav",
-        str(dst_wav),
+        "s16le",                # raw 16-bit PCM
+        "-",
     ]
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     if p.returncode != 0:
-        raise RuntimeError(f"ffmpeg failed: {p.stderr[-2000:]}")  # keep tail
+        err = p.stderr.decode("utf-8", errors="replace")
+        raise RuntimeError(f"ffmpeg failed: {err[-2000:]}")  # keep tail
+
+    return np.frombuffer(p.stdout, np.int16).astype(np.float32) / 32768.0
 
 
-def _upsert_text_segment(db: Session, artifact_id: int, text: str) -> None:
+def _resolve_compute_type(device: str, compute_type: str) -> str:
     """
-    Store transcript into artifact_text_segments as segment_index=0.
-    If segment 0 exists, overwrite; else create.
+    Map compute_type="auto" to int8 on CPU and float16 on GPU.
+    CTranslate2's own "auto" can fall back to float32 on CPU.
     """
-    seg = (
-        db.query(models.ArtifactTextSegment)
-        .filter(
-            models.ArtifactTextSegment.artifact_id == artifact_id,
-            models.ArtifactTextSegment.segment_index == 0,
-        )
-        .first()
+    if compute_type != "auto":
+        return compute_type
+    return "float16" if _resolve_device(device) == "cuda" else "int8"
+
+
+def _resolve_device(device: str) -> str:
+    """Map device="auto" to cuda when CTranslate2 sees a GPU, else cpu."""
+    if device != "auto":
+        return device
+    try:
+        import ctranslate2
+
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except Exception:
+        return "cpu"
+
+
+@functools.lru_cache(maxsize=2)
+def _get_whisper(model_name: str, device: str, compute_type: str):
+    """
+    Load a WhisperModel once per (model, device, compute_type) and keep it
+    warm for the lifetime of the worker process.
+    """
+    # Import here to avoid import-time crashes if dependency missing
+    try:
+        from faster_whisper import WhisperModel
+    except Exception as e:
+        raise RuntimeError(
+            "Missing dependency faster-whisper. Install with `pip install faster-whisper`."
+        ) from e
+
+    return WhisperModel(
+        model_name,
+        device=device,
+        compute_type=_resolve_compute_type(device, compute_type),
+        cpu_threads=WHISPER_CPU_THREADS,
+        num_workers=1,
     )
 
-    if seg is None:
-        seg = models.ArtifactTextSegment(
-            artifact_id=artifact_id,
-            segment_index=0,
-            text=text,
-            source_ref="transcript",  # if you have a 'source' column; otherwise remove this line
-        )
-        db.add(seg)
-    else:
-        seg.text = text
 
+def _upsert_text_segment(db: Session, artifact: models.Artifact, text: str) -> None:
+    """
+    Store transcript into artifact_text_segments as segment_index=0.
+    Single INSERT ... ON CONFLICT(artifact_id, segment_index) DO UPDATE,
+    skipped entirely when the transcript is unchanged since the last run.
+    """
+    digest = text_cache.segments_sha256([(0, "transcript", text)])
+    if digest == artifact.last_extracted_sha256:
+        return
+
+    stmt = upsert_insert(db, models.ArtifactTextSegment).values(
+        artifact_id=artifact.id,
+        segment_index=0,
+        text=text,
+        source_ref="transcript",
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["artifact_id", "segment_index"],
+        set_={"text": stmt.excluded.text},
+    )
+    db.execute(stmt)
+    artifact.last_extracted_sha256 = digest
     db.commit()
 
 
-def transcribe_audio_video(db: Session, artifact: models.Artifact) -> None:
+def transcribe_audio_video(db: Session, artifact: models.Artifact, use_cache: bool = True) -> None:
     """
     Transcribe an audio or video artifact using faster-whisper and store transcript.
 
     Expected:
       - artifact.storage_path points to local file (via get_artifact_path())
       - artifact.kind is "audio" or "video" (or mime type indicates it)
+
+    use_cache=False (reprocess jobs) ignores a cached transcript of the same file.
     """
     path = get_artifact_path(artifact)
     if not path.exists():
         raise RuntimeError(f"Artifact file does not exist: {path}")
 
-    # Convert to wav (safe format for whisper)
-    with tempfile.TemporaryDirectory() as td:
-        td_path = Path(td)
-        wav_path = td_path / "audio.wav"
-        _extract_audio_to_wav(path, wav_path)
-
-        # Import here to avoid import-time crashes if dependency missing
-        try:
-            from faster_whisper import WhisperModel
-        except Exception as e:
-            raise RuntimeError(
-                "Missing dependency faster-whisper. Install with `pip install faster-whisper`."
-            ) from e
-
-        model_name = os.getenv("WHISPER_MODEL", WHISPER_MODEL)
-        device = os.getenv("WHISPER_DEVICE", WHISPER_DEVICE)
-        compute_type = os.getenv("WHISPER_COMPUTE_TYPE", WHISPER_COMPUTE_TYPE)
-        language = os.getenv("WHISPER_LANGUAGE", WHISPER_LANGUAGE)
-
-        model = WhisperModel(model_name, device=device, compute_type=compute_type)
-        print(f"[audio] about to transcribe") 
-        # segments is a generator of (start,end,text)
-        segments, info = model.transcribe(
-            str(wav_path),
-            language=language,       # None => auto-detect
-            vad_filter=True,         # helps for long clips
+    model_name = os.getenv("WHISPER_MODEL", WHISPER_MODEL)
+    device = os.getenv("WHISPER_DEVICE", WHISPER_DEVICE)
+    compute_type = os.getenv("WHISPER_COMPUTE_TYPE", WHISPER_COMPUTE_TYPE)
+    language = os.getenv("WHISPER_LANGUAGE", WHISPER_LANGUAGE)
+
+    # Same bytes already transcribed with these settings? Skip decode + whisper.
+    file_sha = text_cache.artifact_sha256(artifact)
+    cache_key = text_cache.cache_key(
+        "audio",
+        AUDIO_EXTRACTOR_VERSION,
+        model=model_name,
+        language=language,
+        device=_resolve_device(device),
+        compute_type=_resolve_compute_type(device, compute_type),
+        beam_size=WHISPER_BEAM_SIZE,
+    )
+    if use_cache and text_cache.restore_segments(db, artifact.id, file_sha, cache_key):
+        text_cache.commit_segments(db, artifact)
+        seg = (
+            db.query(models.ArtifactTextSegment)
+            .filter(models.ArtifactTextSegment.artifact_id == artifact.id)
+            .order_by(models.ArtifactTextSegment.segment_index.asc())
+            .first()
         )
-        print(f"[audio] transcribe returned; iterating segments...", flush=True)
-        parts: list[str] = []
-        for s in segments:
-            # You can include timestamps if you want:
-            # parts.append(f"[{s.start:.2f}-{s.end:.2f}] {s.text.strip()}")
-            parts.append(s.text.strip())
-
-        transcript = "\n".join([p for p in parts if p]).strip()
-
-        if not transcript:
-            transcript = "(no transcript produced)"
-        print(f"[audio] transcribe returned; iterating segments...", flush=True)
-        # Save transcript in DB
-        _upsert_text_segment(db, artifact.id, transcript)
-
-        # Optional: set artifact.text_content too for quick rendering/search
-        artifact.text_content = transcript
-        artifact.status = "processed"
-        artifact.error_message = None
-        db.add(artifact)
-        db.commit()
+        _mark_transcribed(db, artifact, seg.text if seg else "")
+        return
+
+    # Decode straight to an in-memory sample array (faster-whisper accepts ndarray)
+    audio = _decode_audio_pcm(path)
+
+    model = _get_whisper(model_name, device, compute_type)
+    log.debug("about to transcribe artifact_id=%s", artifact.id)
+    # segments is a generator of (start,end,text)
+    segments, info = model.transcribe(
+        audio,
+        language=language,       # None => auto-detect
+        vad_filter=True,         # helps for long clips
+        beam_size=WHISPER_BEAM_SIZE,
+    )
+    log.debug("transcribe returned; iterating segments...")
+    buf = io.StringIO()
+    for s in segments:
+        # You can include timestamps if you want:
+        # buf.write(f"[{s.start:.2f}-{s.end:.2f}] ")
+        t = s.text.strip()
+        if t:
+            buf.write(t)
+            buf.write("\n")
+
+    transcript = buf.getvalue().rstrip()
+
+    if not transcript:
+        transcript = "(no transcript produced)"
+    log.debug("transcript ready artifact_id=%s chars=%d", artifact.id, len(transcript))
+    # Save transcript in DB
+    _upsert_text_segment(db, artifact, transcript)
+    text_cache.store_segments(db, artifact.id, file_sha, cache_key)
+
+    _mark_transcribed(db, artifact, transcript)
+
+
+def _mark_transcribed(db: Session, artifact: models.Artifact, transcript: str) -> None:
+    # Optional: set artifact.text_content too for quick rendering/search
+    artifact.text_content = transcript
+    artifact.status = "processed"
+    artifact.error_message = None
+    db.add(artifact)
+    db.commit()
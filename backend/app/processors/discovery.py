@@ -1,16 +1,36 @@
 from __future__ import annotations
 
-import json
+import functools
 import re
+from sqlalchemy import bindparam, delete, select
 from sqlalchemy.orm import Session
 
 from backend.app import models
-from backend.app.processors.structured import get_llm, run_llm, parse_json_loose
+from backend.app.processors.structured import (
+    bounded_text,
+    encode_claim_value,
+    get_llm,
+    parse_json_loose,
+    run_llm,
+)
 
+MAX_INPUT_CHARS = 12000
 
+# Built once at import; executed with {"aid": artifact_id} per job.
+_DELETE_DISCOVERY_CLAIMS = (
+    delete(models.Claim)
+    .where(models.Claim.artifact_id == bindparam("aid"))
+    .where(models.Claim.field_key.like("disc:%"))
+    .execution_options(synchronize_session=False)
+)
+
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+@functools.lru_cache(maxsize=4096)
 def _slug(s: str) -> str:
-    s = s.lower().strip()
-    s = re.sub(r"[^a-z0-9]+", "_", s).strip("_")
+    s = _SLUG_RE.sub("_", s.lower().strip()).strip("_")
     return s[:80] or "fact"
 
 
@@ -39,39 +59,41 @@ Rules:
 - Do NOT invent facts. If unsure, omit.
 
 Input:
-\"\"\"{text[:12000]}\"\"\"
+\"\"\"{text}\"\"\"
 
 JSON:
 """
 
 
-def extract_discovery_facts(db: Session, artifact: models.Artifact, max_facts: int = 40) -> None:
-    segs = (
-        db.query(models.ArtifactTextSegment)
-        .filter(models.ArtifactTextSegment.artifact_id == artifact.id)
+def extract_discovery_facts(
+    db: Session,
+    artifact: models.Artifact,
+    max_facts: int = 40,
+    llm=None,
+) -> None:
+    # Stream just the text column in batches; no ORM objects per segment
+    stmt = (
+        select(models.ArtifactTextSegment.text)
+        .where(models.ArtifactTextSegment.artifact_id == artifact.id)
         .order_by(models.ArtifactTextSegment.segment_index.asc())
-        .all()
+        .execution_options(yield_per=256)
     )
-    text = "\n".join((s.text or "") for s in segs).strip()
-
-    # wipe old discovery claims
-    db.query(models.Claim).filter(
-        models.Claim.artifact_id == artifact.id,
-        models.Claim.field_key.like("disc:%"),
-    ).delete(synchronize_session=False)
-    db.commit()
-
-    if not text:
-        return
-
-    llm = get_llm()
-    out = run_llm(llm, _build_prompt(text, max_facts=max_facts))
-    data = parse_json_loose(out)
-
-    facts = data.get("facts", [])
-    if not isinstance(facts, list):
-        return
-
+    text = bounded_text(db.execute(stmt).scalars(), MAX_INPUT_CHARS)
+
+    facts: list = []
+    if text:
+        # Run the model before touching the DB: the write transaction below
+        # stays short, and a failed LLM call leaves the old claims intact.
+        if llm is None:
+            llm = get_llm()
+        out = run_llm(llm, _build_prompt(text, max_facts=max_facts))
+        data = parse_json_loose(out)
+
+        facts = data.get("facts", [])
+        if not isinstance(facts, list):
+            facts = []
+
+    rows: list[dict] = []
     for item in facts:
         if not isinstance(item, dict):
             continue
@@ -89,16 +111,21 @@ def extract_discovery_facts(db: Session, artifact: models.Artifact, max_facts: i
         conf = float(item.get("confidence", 0.5) or 0.5)
         conf = max(0.0, min(1.0, conf))
 
-        db.add(
-            models.Claim(
-                artifact_id=artifact.id,
-                building_id=artifact.building_id,
-                field_key=f"disc:{_slug(label)}",
-                value_json=json.dumps(payload),
-                unit=None,
-                confidence=conf,
-                source_ref="discovery:llamacpp",
-            )
+        rows.append(
+            {
+                "artifact_id": artifact.id,
+                "building_id": artifact.building_id,
+                "field_key": f"disc:{_slug(label)}",
+                "value_json": encode_claim_value(payload),
+                "unit": None,
+                "confidence": conf,
+                "source_ref": "discovery:llamacpp",
+            }
         )
 
+    # Wipe old discovery claims and insert the new ones in one transaction
+    db.execute(_DELETE_DISCOVERY_CLAIMS, {"aid": artifact.id})
+    # One executemany INSERT instead of per-row ORM unit-of-work bookkeeping
+    if rows:
+        db.bulk_insert_mappings(models.Claim, rows)
     db.commit()
@@ -1,13 +1,26 @@
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from backend.app import models
+from backend.app.services import text_cache
 from backend.app.services.storage import get_artifact_path
 
-def ocr_image(db: Session, artifact: models.Artifact) -> None:
+# Bump when a code change alters the OCR text; older cache entries then miss
+IMAGE_EXTRACTOR_VERSION = 2
+
+
+def ocr_image(db: Session, artifact: models.Artifact, use_cache: bool = True) -> None:
     """
     Runs OCR on an image artifact and writes ArtifactTextSegment rows.
+    use_cache=False (reprocess jobs) ignores the text cache.
     """
     path = get_artifact_path(artifact)
 
+    file_sha = text_cache.artifact_sha256(artifact)
+    cache_key = text_cache.cache_key("image", IMAGE_EXTRACTOR_VERSION)
+    if use_cache and text_cache.restore_segments(db, artifact.id, file_sha, cache_key):
+        text_cache.commit_segments(db, artifact)
+        return
+
     try:
         from PIL import Image
         import pytesseract
@@ -22,19 +35,28 @@ def ocr_image(db: Session, artifact: models.Artifact) -> None:
     text = pytesseract.image_to_string(img) or ""
     text = text.strip()
 
-    _write_segments(db, artifact.id, [(1, text)], source_prefix="image")
+    _write_segments(db, artifact, [(1, text)], source_prefix="image")
+    text_cache.store_segments(db, artifact.id, file_sha, cache_key)
 
-def _write_segments(db: Session, artifact_id: int, parts, source_prefix: str = "ocr"):
+def _write_segments(db: Session, artifact: models.Artifact, parts, source_prefix: str = "ocr"):
     # parts: list[(page_num, text)]
+    rows = [
+        {
+            "artifact_id": artifact.id,
+            "segment_index": idx,
+            "text": t,
+            "source_ref": f"{source_prefix}:{page}",
+        }
+        for idx, (page, t) in enumerate(parts)
+    ]
+    digest = text_cache.segments_sha256((r["segment_index"], r["source_ref"], r["text"]) for r in rows)
+    if digest == artifact.last_extracted_sha256:
+        return  # identical to the last run; leave the rows alone
+
     db.query(models.ArtifactTextSegment).filter(
-        models.ArtifactTextSegment.artifact_id == artifact_id
-    ).delete()
-    for idx, (page, t) in enumerate(parts):
-        seg = models.ArtifactTextSegment(
-            artifact_id=artifact_id,
-            segment_index=idx,
-            text=t,
-            source_ref=f"{source_prefix}:{page}",
-        )
-        db.add(seg)
+        models.ArtifactTextSegment.artifact_id == artifact.id
+    ).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(models.ArtifactTextSegment), rows)
+    artifact.last_extracted_sha256 = digest
     db.commit()
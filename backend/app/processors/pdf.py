@@ -1,136 +1,344 @@
 from __future__ import annotations
 
-import traceback
-from typing import Iterable
+import contextlib
+import itertools
+import logging
+import multiprocessing
+import os
+import shlex
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from backend.app import models
+from backend.app.services import text_cache
 from backend.app.services.storage import get_artifact_path
 
 
 MIN_TOTAL_CHARS = 200          # total chars across doc to consider "real"
 MIN_NONEMPTY_PAGES = 1         # require at least this many pages with text
+MIN_PAGE_CHARS = 20            # below this a page's text layer is treated as missing (OCR it)
+OCR_DPI = 200
+OCR_MAX_SIDE_PX = 3000         # cap render size for oversized (plan/drawing) pages
+OCR_TESSERACT_CONFIG = os.getenv("PDF_OCR_TESSERACT_CONFIG", "--oem 1 --psm 6")
+OCR_BATCH_PAGES = 32           # pages per tesseract process (one model load each)
+SEGMENT_INSERT_BATCH = 1000   # rows per executemany INSERT
+# Bump when a code change alters the extracted text; cached results from
+# older versions (or other settings above) are then ignored.
+PDF_EXTRACTOR_VERSION = 2
+OCR_WORKERS = int(os.getenv("PDF_OCR_WORKERS", str(min(os.cpu_count() or 1, 4))))
 
+_ocr_executor: ProcessPoolExecutor | None = None
 
-def extract_text_from_pdf(db: Session, artifact: models.Artifact) -> None:
+log = logging.getLogger(__name__)
+
+
+def _cache_key() -> str:
+    return text_cache.cache_key(
+        "pdf",
+        PDF_EXTRACTOR_VERSION,
+        min_page_chars=MIN_PAGE_CHARS,
+        dpi=OCR_DPI,
+        max_side_px=OCR_MAX_SIDE_PX,
+        tesseract_config=OCR_TESSERACT_CONFIG,
+    )
+
+
+def extract_text_from_pdf(db: Session, artifact: models.Artifact, use_cache: bool = True) -> None:
+    """
+    Extract a PDF's text into segments: embedded text layer, OCR for pages
+    without one. use_cache=False (reprocess jobs) ignores the text cache
+    and extracts afresh.
+    """
     path = get_artifact_path(artifact)
-    print(f"[pdf] START artifact_id={artifact.id} path={path} exists={path.exists()} size={path.stat().st_size if path.exists() else None}")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "START artifact_id=%s path=%s exists=%s size=%s",
+            artifact.id, path, path.exists(), path.stat().st_size if path.exists() else None,
+        )
 
 
-    # 1) Embedded text
-    embedded_parts: list[tuple[int, str]] = []
+    # 0) Same bytes already extracted (retry / re-upload)? Reuse those segments.
+    file_sha = text_cache.artifact_sha256(artifact)
+    if use_cache and text_cache.restore_segments(db, artifact.id, file_sha, _cache_key()):
+        text_cache.commit_segments(db, artifact)
+        log.info("text cache hit artifact_id=%s sha256=%s", artifact.id, file_sha[:12])
+        return
+
+    import fitz  # pymupdf
+
+    # One open document shared by the embedded and OCR passes
+    with contextlib.closing(fitz.open(path)) as doc:
+        _extract_from_doc(db, artifact, doc, file_sha)
+
+
+def _extract_from_doc(db: Session, artifact: models.Artifact, doc, file_sha: str) -> None:
+    # Text is collected first and written in one short transaction at the
+    # end. OCR can run for minutes; holding SQLite's write lock across it
+    # (by deleting/inserting segments first) would make every other writer
+    # time out with "database is locked". Page text is small next to the
+    # PDF itself, so keeping it in memory until then is cheap.
+
+    # 1) Embedded text. Pages with (almost) no text layer are set aside in
+    # `thin_pages` instead.
+    thin_pages: dict[int, str] = {}
+    embedded: list[tuple[int, str]] = []
     embedded_err: Exception | None = None
 
     try:
-        import fitz  # pymupdf
-        doc = fitz.open(path)
-        for i in range(doc.page_count):
-            page = doc.load_page(i)
-            t = (page.get_text("text") or "").strip()
-            if t:
-                embedded_parts.append((i + 1, t))
-        doc.close()
-
+        embedded = list(_iter_embedded_pages(doc, thin_pages))
     except Exception as e:
-        print(f"[pdf] embedded extraction failed artifact_id={artifact.id}: {e!r}")
-        traceback.print_exc()
+        log.warning("embedded extraction failed artifact_id=%s: %r", artifact.id, e, exc_info=True)
+        embedded = []
         embedded_err = e
+    embedded_stats = _page_stats(embedded)
 
-    if _looks_good(embedded_parts):
-        _write_segments(db, artifact.id, embedded_parts, source_prefix="pdf:embedded")
-        return
+    # 2) Mixed document (e.g. typed cover + scanned body): OCR only the thin pages
+    if embedded_err is None and embedded_stats[0] > 0:
+        ocr_text: dict[int, str] = {}
+        if thin_pages:
+            try:
+                ocr_parts = ocr_pdf_pages(doc, only_pages=[n - 1 for n in thin_pages])
+            except Exception as e:
+                log.warning("OCR of %d thin page(s) failed artifact_id=%s: %r", len(thin_pages), artifact.id, e)
+                ocr_parts = []
+            ocr_text = {n: t for n, t in ocr_parts if (t or "").strip()}
+        # Keep the short embedded text for pages OCR couldn't improve on
+        fallback = [(n, t) for n, t in thin_pages.items() if n not in ocr_text]
+        ocr_stats = _page_stats(ocr_text.items())
+        fb_stats = _page_stats(fallback)
+        embedded_stats = (embedded_stats[0] + fb_stats[0], embedded_stats[1] + fb_stats[1])
+
+        if _looks_good(embedded_stats[0] + ocr_stats[0], embedded_stats[1] + ocr_stats[1]):
+            _write_segments(db, artifact.id, embedded, source_prefix="pdf:embedded")
+            _write_segments(db, artifact.id, ocr_text.items(), source_prefix="pdf:ocr", replace=False)
+            _write_segments(db, artifact.id, fallback, source_prefix="pdf:embedded", replace=False)
+            text_cache.commit_and_store_segments(db, artifact, file_sha, _cache_key())
+            return
+        if thin_pages:
+            _raise_too_little_text(embedded_err, embedded_stats, ocr_stats)
 
-    # 2) OCR fallback
+    # 3) Full OCR fallback (no usable text layer at all)
     try:
-        ocr_parts = ocr_pdf_pages(path)
+        ocr_parts = ocr_pdf_pages(doc)
     except Exception as e:
         # If embedded also failed, surface that context too
         if embedded_err is not None:
             raise RuntimeError(f"PDF embedded extraction failed: {embedded_err!r}; OCR failed: {e!r}") from e
         raise
 
-    if _looks_good(ocr_parts):
+    ocr_stats = _page_stats(ocr_parts)
+    if _looks_good(*ocr_stats):
         _write_segments(db, artifact.id, ocr_parts, source_prefix="pdf:ocr")
+        text_cache.commit_and_store_segments(db, artifact, file_sha, _cache_key())
         return
 
     # If we get here: both embedded + OCR were “empty-ish”
+    _raise_too_little_text(embedded_err, embedded_stats, ocr_stats)
+
+
+def _raise_too_little_text(
+    embedded_err: Exception | None,
+    embedded_stats: tuple[int, int],
+    ocr_stats: tuple[int, int],
+) -> None:
     msg = "PDF text extraction produced too little text."
     if embedded_err is not None:
         msg += f" Embedded extraction error: {embedded_err!r}."
-    msg += f" Embedded pages={len([p for p in embedded_parts if p[1].strip()])}, chars={_total_chars(embedded_parts)}."
-    msg += f" OCR pages={len([p for p in ocr_parts if p[1].strip()])}, chars={_total_chars(ocr_parts)}."
+    msg += f" Embedded pages={embedded_stats[0]}, chars={embedded_stats[1]}."
+    msg += f" OCR pages={ocr_stats[0]}, chars={ocr_stats[1]}."
     raise RuntimeError(msg)
 
 
-def _looks_good(parts: list[tuple[int, str]]) -> bool:
-    nonempty_pages = sum(1 for _, t in parts if (t or "").strip())
-    return (nonempty_pages >= MIN_NONEMPTY_PAGES) and (_total_chars(parts) >= MIN_TOTAL_CHARS)
+def _iter_embedded_pages(doc, thin_pages: dict[int, str]) -> Iterator[tuple[int, str]]:
+    """
+    Yield (page_num, text) for each page whose embedded text layer has at
+    least MIN_PAGE_CHARS; shorter pages go into `thin_pages` for OCR.
+    """
+    import fitz  # pymupdf
 
+    # Plain-text defaults, with image blocks explicitly masked out so MuPDF
+    # never decodes embedded images for this pass. (TEXT_INHIBIT_SPACES is
+    # deliberately not set: it glues words on PDFs without explicit spaces.)
+    flags = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_IMAGES
+    for i, page in enumerate(doc):
+        t = (page.get_text("text", flags=flags) or "").strip()
+        if len(t) < MIN_PAGE_CHARS:
+            thin_pages[i + 1] = t
+            continue
+        yield (i + 1, t)
 
-def _total_chars(parts: list[tuple[int, str]]) -> int:
-    return sum(len((t or "").strip()) for _, t in parts)
+
+def _page_stats(parts: Iterable[tuple[int, str]]) -> tuple[int, int]:
+    """(nonempty_pages, total_chars) of `parts`, counted the way _write_segments writes them."""
+    n_pages = 0
+    total_chars = 0
+    for _, t in parts:
+        t = (t or "").strip()
+        if t:
+            n_pages += 1
+            total_chars += len(t)
+    return n_pages, total_chars
+
+
+def _looks_good(nonempty_pages: int, total_chars: int) -> bool:
+    return (nonempty_pages >= MIN_NONEMPTY_PAGES) and (total_chars >= MIN_TOTAL_CHARS)
 
 
 def _write_segments(
     db: Session,
     artifact_id: int,
-    parts: list[tuple[int, str]],
+    parts: Iterable[tuple[int, str]],
     *,
     source_prefix: str,
+    replace: bool = True,
 ) -> None:
-    # IMPORTANT: only delete + rewrite if we actually have something to write
-    if not parts:
-        raise RuntimeError("Refusing to write 0 segments.")
-
-    db.query(models.ArtifactTextSegment).filter(
-        models.ArtifactTextSegment.artifact_id == artifact_id
-    ).delete(synchronize_session=False)
+    """
+    Write the non-empty `parts` as segments (replacing existing ones unless
+    replace=False), inserting in batches of SEGMENT_INSERT_BATCH.
+    segment_index is the 0-based page index, so pages written in separate
+    calls still sort in page order. Does NOT commit.
+    """
+    if replace:
+        db.query(models.ArtifactTextSegment).filter(
+            models.ArtifactTextSegment.artifact_id == artifact_id
+        ).delete(synchronize_session=False)
 
-    seg_index = 0
+    stmt = insert(models.ArtifactTextSegment)
+    batch: list[dict] = []
     for page, t in parts:
         t = (t or "").strip()
         if not t:
             continue
-        db.add(
-            models.ArtifactTextSegment(
-                artifact_id=artifact_id,
-                segment_index=seg_index,
-                text=t,
-                source_ref=f"{source_prefix}:page:{page}",
-            )
+        batch.append(
+            {
+                "artifact_id": artifact_id,
+                "segment_index": page - 1,
+                "text": t,
+                "source_ref": f"{source_prefix}:page:{page}",
+            }
         )
-        seg_index += 1
+        if len(batch) >= SEGMENT_INSERT_BATCH:
+            db.execute(stmt, batch)
+            batch = []
 
-    if seg_index == 0:
-        raise RuntimeError("All extracted segments were empty after stripping.")
+    if batch:
+        db.execute(stmt, batch)
 
-    db.commit()
+
+def _get_ocr_executor() -> ProcessPoolExecutor:
+    # Long-lived pool so the worker pays process start-up once, not per PDF
+    global _ocr_executor
+    if _ocr_executor is None:
+        _ocr_executor = ProcessPoolExecutor(
+            max_workers=OCR_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _ocr_executor
+
+
+def _ocr_page_batch(path: str, page_indices: list[int], dpi: int = OCR_DPI) -> list[tuple[int, str]]:
+    """
+    OCR a batch of pages. Top-level so it can run in a pool process; only the
+    path + indices cross the process boundary, never a Pixmap.
+    """
+    import fitz  # pymupdf
+
+    doc = fitz.open(path)
+    try:
+        return _ocr_pages(((i, doc.load_page(i)) for i in page_indices), dpi)
+    finally:
+        doc.close()
+
+
+def _ocr_pages(pages: Iterable[tuple[int, object]], dpi: int = OCR_DPI) -> list[tuple[int, str]]:
+    """
+    OCR (page_index, fitz.Page) pairs with ONE tesseract process per
+    OCR_BATCH_PAGES pages, instead of a process (and LSTM model load) per page.
+    """
+    out: list[tuple[int, str]] = []
+    it = iter(pages)
+    while True:
+        batch = list(itertools.islice(it, OCR_BATCH_PAGES))
+        if not batch:
+            return out
+        out.extend(_run_tesseract_batch(batch, dpi))
 
 
-def ocr_pdf_pages(path) -> list[tuple[int, str]]:
+def _run_tesseract_batch(batch: list[tuple[int, object]], dpi: int) -> list[tuple[int, str]]:
+    import fitz  # pymupdf
+    import pytesseract
+
+    with tempfile.TemporaryDirectory(prefix="pdf_ocr_") as tmp:
+        image_paths = []
+        for i, page in batch:
+            # Tesseract grayscales internally anyway; render 1 byte/pixel
+            # instead of 3, and let MuPDF write the PGM (no PIL, no PNG encode).
+            pix = page.get_pixmap(dpi=_adaptive_dpi(page, dpi), colorspace=fitz.csGRAY, alpha=False)
+            img_path = os.path.join(tmp, f"page_{i:05d}.pgm")
+            pix.save(img_path)
+            del pix
+            image_paths.append(img_path)
+
+        # A .txt input is read by tesseract as a list of images; pages come
+        # back on stdout separated by form feeds.
+        list_path = os.path.join(tmp, "pages.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(image_paths) + "\n")
+
+        cmd = [pytesseract.pytesseract.tesseract_cmd, list_path, "stdout", *shlex.split(OCR_TESSERACT_CONFIG)]
+        p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    if p.returncode != 0:
+        err = p.stderr.decode("utf-8", errors="replace")
+        raise RuntimeError(f"tesseract failed: {err[-2000:]}")
+
+    texts = p.stdout.decode("utf-8", errors="replace").split("\f")
+    if len(texts) < len(batch):
+        raise RuntimeError(f"tesseract returned {len(texts)} pages for {len(batch)} images")
+    return [(i + 1, t.strip()) for (i, _), t in zip(batch, texts)]
+
+
+def _adaptive_dpi(page, dpi: int) -> int:
+    """Lower the DPI for large pages so the longest side stays <= OCR_MAX_SIDE_PX."""
+    longest_pt = max(page.rect.width, page.rect.height) or 1.0
+    return max(72, min(dpi, int(OCR_MAX_SIDE_PX * 72 / longest_pt)))
+
+
+def ocr_pdf_pages(doc, only_pages: Iterable[int] | None = None) -> list[tuple[int, str]]:
     """
-    Render PDF pages to images via PyMuPDF and run Tesseract OCR.
+    Render pages of an open fitz.Document to images and run Tesseract OCR.
+    `only_pages` restricts OCR to those 0-based page indices.
+    Pages are split into batches (one tesseract run each) and spread over a
+    process pool (PDF_OCR_WORKERS) when there is more than one batch; pool
+    processes reopen the file by `doc.name`.
     Returns list[(page_num, text)].
     """
     try:
-        import fitz  # pymupdf
-        from PIL import Image
-        import pytesseract
+        import pytesseract  # noqa: F401
     except Exception as e:
         raise RuntimeError(
             "PDF OCR deps missing. Install: pip install pymupdf pillow pytesseract; "
             "and install tesseract system package."
         ) from e
 
-    doc = fitz.open(path)
-    parts: list[tuple[int, str]] = []
-    try:
-        for i in range(doc.page_count):
-            page = doc.load_page(i)
-            pix = page.get_pixmap(dpi=220)  # bump dpi a bit
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            txt = (pytesseract.image_to_string(img) or "").strip()
-            parts.append((i + 1, txt))
-    finally:
-        doc.close()
+    if only_pages is None:
+        indices = list(range(doc.page_count))
+    else:
+        indices = sorted({i for i in only_pages if 0 <= i < doc.page_count})
+
+    # Even shards per pool process, capped at OCR_BATCH_PAGES per tesseract run
+    per_batch = max(1, min(OCR_BATCH_PAGES, -(-len(indices) // max(1, OCR_WORKERS))))
+    batches = [indices[k : k + per_batch] for k in range(0, len(indices), per_batch)]
+
+    if len(batches) <= 1 or OCR_WORKERS <= 1 or not doc.name:
+        if only_pages is None:
+            # Serial: walk the open document with its native page iterator
+            return _ocr_pages(enumerate(doc))
+        return _ocr_pages((i, doc.load_page(i)) for i in indices)
 
-    return parts
+    # map() keeps batch (and so page) order
+    results = _get_ocr_executor().map(_ocr_page_batch, [doc.name] * len(batches), batches)
+    return [part for batch in results for part in batch]
@@ -1,10 +1,15 @@
 # backend/app/processors/registry.py
 from __future__ import annotations
 
+import logging
+
 from sqlalchemy.orm import Session
 
 from backend.app import models
-from backend.app.processors import pdf, image, audio, structured, discovery
+from backend.app.processors import archive, pdf, image, audio, structured, discovery
+from backend.app.services import text_cache
+
+log = logging.getLogger(__name__)
 
 
 def run_job(db: Session, job: models.ProcessingJob) -> None:
@@ -17,31 +22,77 @@ def run_job(db: Session, job: models.ProcessingJob) -> None:
     filename = (artifact.original_filename or "").lower()
     mime = (artifact.mime_type or "").lower()
 
-    print(f"[registry] run_job job_id={job.id} type={jt} artifact_id={artifact.id}")
-    print(f"[registry] artifact kind={kind} mime={mime or None} filename={artifact.original_filename!r}")
+    log.info("run_job job_id=%s type=%s artifact_id=%s", job.id, jt, artifact.id)
+    log.debug("artifact kind=%s mime=%s filename=%r", kind, mime or None, artifact.original_filename)
 
-    if jt == "extract_text":
-        _dispatch_extract_text(db, artifact, kind=kind, filename=filename, mime=mime)
+    if jt in ("extract_text", "reextract_text"):
+        # reextract_text (rerun pipeline / reprocess_all) bypasses the text
+        # cache so extractor or config changes reach already-seen files
+        _dispatch_extract_text(
+            db, artifact, kind=kind, filename=filename, mime=mime, use_cache=jt == "extract_text"
+        )
         return
 
     if jt == "transcribe_audio":
-        print("[registry] -> audio.transcribe_audio_video")
+        log.debug("-> audio.transcribe_audio_video")
         audio.transcribe_audio_video(db, artifact)
         return
 
     if jt == "extract_structured":
-        print("[registry] -> structured.extract_claims_from_text")
+        log.debug("-> structured.extract_claims_from_text")
         structured.extract_claims_from_text(db, artifact)
         return
 
+    if jt == "ingest_zip":
+        log.debug("-> archive.ingest_zip")
+        archive.ingest_zip(db, artifact)
+        return
+
     if jt == "extract_discovery":
-        print("[registry] -> discovery.extract_discovery_facts")
+        log.debug("-> discovery.extract_discovery_facts")
         discovery.extract_discovery_facts(db, artifact)
         return
 
     raise RuntimeError(f"unknown job type: {job.job_type!r}")
 
 
+# extract_text routing tables. When kind, extension and mime point at
+# different handlers, the earliest in _ROUTE_PRIORITY wins (pdf > image > audio > text).
+_ROUTE_PRIORITY = {"pdf": 0, "image": 1, "audio": 2, "text": 3}
+
+_KIND_ROUTES = {
+    "pdf": "pdf",
+    "image": "image",
+    "photo": "image",
+    "audio": "audio",
+    "video": "audio",
+    "text": "text",
+}
+
+_EXT_ROUTES = {
+    ".pdf": "pdf",
+    **dict.fromkeys((".png", ".jpg", ".jpeg", ".webp", ".gif"), "image"),
+    **dict.fromkeys((".mp3", ".wav", ".m4a", ".aac", ".ogg", ".mp4", ".mov"), "audio"),
+}
+
+# Exact mime first, then the major type ("image/png" -> "image")
+_MIME_ROUTES = {"application/pdf": "pdf"}
+_MIME_MAJOR_ROUTES = {"image": "image", "audio": "audio", "video": "audio"}
+
+
+def _route_extract_text(*, kind: str, filename: str, mime: str) -> str | None:
+    # Last suffix, including dotfile-style names like ".pdf"
+    _, dot, ext = filename.rpartition(".")
+    major, slash, _ = mime.partition("/")
+    candidates = (
+        _KIND_ROUTES.get(kind),
+        _EXT_ROUTES.get(dot + ext) if dot else None,
+        _MIME_ROUTES.get(mime) or (_MIME_MAJOR_ROUTES.get(major) if slash else None),
+    )
+    routes = [r for r in candidates if r is not None]
+    return min(routes, key=_ROUTE_PRIORITY.__getitem__) if routes else None
+
+
 def _dispatch_extract_text(
     db: Session,
     artifact: models.Artifact,
@@ -49,29 +100,25 @@ def _dispatch_extract_text(
     kind: str,
     filename: str,
     mime: str,
+    use_cache: bool = True,
 ) -> None:
-    # Route by kind/extension first (zip uploads often have mime=None)
-    if kind == "pdf" or filename.endswith(".pdf") or mime == "application/pdf":
-        print("[registry] -> pdf.extract_text_from_pdf")
-        pdf.extract_text_from_pdf(db, artifact)
-        return
-
-    if kind in ("image", "photo") or filename.endswith((".png", ".jpg", ".jpeg", ".webp", ".gif")) or mime.startswith("image/"):
-        print("[registry] -> image.ocr_image")
-        image.ocr_image(db, artifact)
-        return
-
-    if kind in ("audio", "video") or filename.endswith((".mp3", ".wav", ".m4a", ".aac", ".ogg", ".mp4", ".mov")) or mime.startswith(("audio/", "video/")):
-        print("[registry] -> audio.transcribe_audio_video")
-        audio.transcribe_audio_video(db, artifact)
-        return
-
-    if kind == "text":
-        print("[registry] -> inline: text artifact -> ArtifactTextSegment")
+    # Route by kind/extension/mime (zip uploads often have mime=None)
+    route = _route_extract_text(kind=kind, filename=filename, mime=mime)
+
+    if route == "pdf":
+        log.debug("-> pdf.extract_text_from_pdf")
+        pdf.extract_text_from_pdf(db, artifact, use_cache=use_cache)
+    elif route == "image":
+        log.debug("-> image.ocr_image")
+        image.ocr_image(db, artifact, use_cache=use_cache)
+    elif route == "audio":
+        log.debug("-> audio.transcribe_audio_video")
+        audio.transcribe_audio_video(db, artifact, use_cache=use_cache)
+    elif route == "text":
+        log.debug("-> inline: text artifact -> ArtifactTextSegment")
         _write_text_artifact_segment(db, artifact)
-        return
-
-    print(f"[registry] extract_text: unsupported kind={kind} filename={filename!r} mime={mime!r}; skipping")
+    else:
+        log.warning("extract_text: unsupported kind=%s filename=%r mime=%r; skipping", kind, filename, mime)
 
 
 def _write_text_artifact_segment(db: Session, artifact: models.Artifact) -> None:
@@ -79,6 +126,10 @@ def _write_text_artifact_segment(db: Session, artifact: models.Artifact) -> None
     if not txt:
         return
 
+    digest = text_cache.segments_sha256([(0, "text:note", txt)])
+    if digest == artifact.last_extracted_sha256:
+        return  # note unchanged since the last run
+
     db.query(models.ArtifactTextSegment).filter(
         models.ArtifactTextSegment.artifact_id == artifact.id
     ).delete(synchronize_session=False)
@@ -91,4 +142,5 @@ def _write_text_artifact_segment(db: Session, artifact: models.Artifact) -> None
             source_ref="text:note",
         )
     )
+    artifact.last_extracted_sha256 = digest
     db.commit()
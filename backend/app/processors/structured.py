@@ -1,13 +1,15 @@
 from __future__ import annotations
 
+import hashlib
+import io
 import json
+import logging
 import os
-import re
 import time
-import traceback
 from dataclasses import dataclass
 from typing import Any, Optional
 
+from sqlalchemy import JSON, insert, select
 from sqlalchemy.orm import Session
 
 from backend.app import models
@@ -16,7 +18,20 @@ from backend.app.processors.structured_keys import ALLOWED_KEYS
 MAX_CHARS_TO_MODEL = int(os.getenv("STRUCTURED_MAX_CHARS", "12000"))
 MAX_MODEL_ATTEMPTS = int(os.getenv("STRUCTURED_LLM_ATTEMPTS", "2"))
 
+log = logging.getLogger(__name__)
+
+_CLAIM_HAS_EVIDENCE = "evidence" in models.Claim.__table__.columns
+# value_json is TEXT today; if it becomes a JSON column the dialect encodes it
+_CLAIM_VALUE_IS_NATIVE_JSON = isinstance(models.Claim.__table__.c.value_json.type, JSON)
+
 _llm_singleton = None
+_llm_key: Optional[tuple[str, float]] = None  # (gguf_path, mtime) the singleton was loaded from
+_claims_grammar = None
+_claims_grammar_built = False
+
+# Opt-in llama.cpp prompt-state cache (MB). Each entry is a full KV snapshot,
+# so size this for a few prompts' worth of n_ctx on the loaded model.
+LLAMA_PROMPT_CACHE_MB = int(os.getenv("LLAMA_PROMPT_CACHE_MB", "0"))
 
 
 @dataclass
@@ -42,38 +57,66 @@ def parse_json_loose(text: str) -> dict[str, Any]:
     return _parse_json_loose(text)
 
 
+def encode_claim_value(value: Any) -> Any:
+    """Compact, non-ASCII-escaped JSON for Claim.value_json (raw value for JSON columns)."""
+    if _CLAIM_VALUE_IS_NATIVE_JSON:
+        return value
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def bounded_text(texts, limit: int) -> str:
+    """
+    Join segment texts with newlines, but stop reading once `limit` chars
+    are buffered; the prompt only ever uses that much.
+    """
+    buf = io.StringIO()
+    n = 0
+    for t in texts:
+        t = t or ""
+        buf.write(t)
+        buf.write("\n")
+        n += len(t) + 1
+        if n >= limit:
+            break
+    return buf.getvalue().strip()[:limit]
+
+
 # --- Main entrypoint ---
 
 def extract_claims_from_text(db: Session, artifact: models.Artifact) -> None:
-    segments = (
-        db.query(models.ArtifactTextSegment)
-        .filter(models.ArtifactTextSegment.artifact_id == artifact.id)
+    # Stream just the text column and stop once MAX_CHARS_TO_MODEL is buffered
+    stmt = (
+        select(models.ArtifactTextSegment.text)
+        .where(models.ArtifactTextSegment.artifact_id == artifact.id)
         .order_by(models.ArtifactTextSegment.segment_index.asc())
-        .all()
+        .execution_options(yield_per=100)
     )
-    raw_text = "\n".join((s.text or "") for s in segments).strip()
+    text = bounded_text(db.execute(stmt).scalars(), MAX_CHARS_TO_MODEL)
 
-    if not raw_text:
+    if not text:
         _overwrite_claims(db, artifact, [])
         return
 
-    text = raw_text[:MAX_CHARS_TO_MODEL]
-    print(f"[structured] START artifact={artifact.id} segs={len(segments)} chars={len(raw_text)}", flush=True)
+    log.info("START artifact=%s chars=%d", artifact.id, len(text))
 
     llm = _get_llm()
     prompt = _build_prompt(text)
-    print(f"[structured] prompt_chars={len(prompt)}", flush=True)
+    log.debug("prompt_chars=%d", len(prompt))
 
 
 
     claims: list[ExtractedClaim] = []
     last_err: Optional[Exception] = None
 
+    # JSON grammar (when llama-cpp supports it) makes malformed output and the
+    # repair round-trip rare; the loop stays for truncated generations.
+    grammar = _get_claims_grammar()
+
     for _attempt in range(1, MAX_MODEL_ATTEMPTS + 1):
         try:
-            print(f"[structured] attempting to run model")
-            out_text = _run_llm(llm, prompt)
-            print(f"[structured] llm returned out_chars={len(out_text)}", flush=True)
+            log.debug("attempt %d: running model", _attempt)
+            out_text = _run_llm(llm, prompt, grammar=grammar)
+            log.debug("llm returned out_chars=%d", len(out_text))
             data = _parse_json_loose(out_text)
 
             raw_claims = data.get("claims", [])
@@ -102,39 +145,62 @@ def extract_claims_from_text(db: Session, artifact: models.Artifact) -> None:
 
 
 def _overwrite_claims(db: Session, artifact: models.Artifact, claims: list[ExtractedClaim]) -> None:
-    db.query(models.Claim).filter(models.Claim.artifact_id == artifact.id).delete()
+    digest = _claims_sha256(artifact, claims)
+    if digest == artifact.last_claims_sha256:
+        return  # same claims as the last run; nothing to rewrite
 
-    claim_cols = set(models.Claim.__table__.columns.keys())
+    db.query(models.Claim).filter(models.Claim.artifact_id == artifact.id).delete(
+        synchronize_session=False
+    )
 
+    rows = []
     for c in claims:
-        kwargs = {
+        row = {
             "artifact_id": artifact.id,
             "building_id": artifact.building_id,
             "field_key": c.key,
-            "value_json": json.dumps(c.value),
+            "value_json": encode_claim_value(c.value),
             "unit": c.unit,
             "confidence": float(c.confidence),
             "source_ref": "structured:llamacpp",
         }
-        if "evidence" in claim_cols:
-            kwargs["evidence"] = c.evidence
+        if _CLAIM_HAS_EVIDENCE:
+            row["evidence"] = c.evidence
+        rows.append(row)
+
+    # One executemany INSERT, no per-row ORM state
+    if rows:
+        db.execute(insert(models.Claim), rows)
+    artifact.last_claims_sha256 = digest
+    db.commit()
 
-        db.add(models.Claim(**kwargs))
 
-    db.commit()
+def _claims_sha256(artifact: models.Artifact, claims: list[ExtractedClaim]) -> str:
+    canon = [
+        [c.key, c.value, c.unit, round(float(c.confidence), 6), c.evidence]
+        for c in sorted(claims, key=lambda c: c.key)
+    ]
+    payload = json.dumps([artifact.building_id, canon], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 # --- llama-cpp backend ---
 
 def _get_llm():
-    global _llm_singleton
-    if _llm_singleton is not None:
-        return _llm_singleton
+    global _llm_singleton, _llm_key
 
     gguf_path = os.getenv("LLAMA_GGUF_PATH")
     if not gguf_path:
         raise RuntimeError("LLAMA_GGUF_PATH is not set (path to .gguf model file).")
 
+    # Keep one warm handle per process; only reload if the model file changed.
+    try:
+        key = (gguf_path, os.path.getmtime(gguf_path))
+    except OSError:
+        key = (gguf_path, 0.0)
+    if _llm_singleton is not None and _llm_key == key:
+        return _llm_singleton
+
     try:
         from llama_cpp import Llama
     except Exception as e:
@@ -153,21 +219,62 @@ def _get_llm():
         vocab_only=False,
         verbose=True,
     )
+    if LLAMA_PROMPT_CACHE_MB > 0:
+        from llama_cpp import LlamaRAMCache
+
+        _llm_singleton.set_cache(LlamaRAMCache(capacity_bytes=LLAMA_PROMPT_CACHE_MB << 20))
+    _llm_key = key
     return _llm_singleton
 
 
-def _run_llm(llm, prompt: str) -> str:
-    print("[structured] ENTER _run_llm", flush=True)
+def _get_claims_grammar():
+    """
+    LlamaGrammar constraining output to {"claims": [...]} with allowed keys
+    only. Built once per process; None if llama-cpp can't build it.
+    """
+    global _claims_grammar, _claims_grammar_built
+    if _claims_grammar_built:
+        return _claims_grammar
+    _claims_grammar_built = True
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "claims": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "key": {"type": "string", "enum": list(ALLOWED_KEYS)},
+                        "value": {"type": ["string", "number", "boolean"]},
+                        "confidence": {"type": "number"},
+                        "evidence": {"type": "string"},
+                    },
+                    "required": ["key", "value", "confidence"],
+                },
+            }
+        },
+        "required": ["claims"],
+    }
+    try:
+        from llama_cpp import LlamaGrammar
+
+        _claims_grammar = LlamaGrammar.from_json_schema(json.dumps(schema), verbose=False)
+    except Exception as e:
+        log.warning("JSON grammar unavailable, using unconstrained output: %r", e)
+        _claims_grammar = None
+    return _claims_grammar
 
+
+def _run_llm(llm, prompt: str, grammar=None) -> str:
     temp_raw = os.getenv("LLAMA_TEMPERATURE", "0.1")
     max_raw = os.getenv("LLAMA_MAX_TOKENS", "700")
-    print(f"[structured] env temp={temp_raw!r} max_tokens={max_raw!r}", flush=True)
+    log.debug("env temp=%r max_tokens=%r", temp_raw, max_raw)
 
     temperature = float(temp_raw)
     max_tokens = int(max_raw)
     stop = ["```", "\n\n\n", "</json>"]
 
-    print("[structured] about to call llm(...)", flush=True)
     t0 = time.time()
     try:
         out = llm(
@@ -175,17 +282,15 @@ def _run_llm(llm, prompt: str) -> str:
             max_tokens=max_tokens,
             temperature=temperature,
             stop=stop,
+            grammar=grammar,
         )
     except Exception as e:
-        print("[structured] llm(...) raised:", repr(e), flush=True)
-        traceback.print_exc()
+        log.exception("llm(...) raised: %r", e)
         raise
 
     dt = time.time() - t0
-    print(f"[structured] llm(...) returned in {dt:.2f}s; keys={list(out.keys())}", flush=True)
-
     text = out["choices"][0]["text"]
-    print(f"[structured] out_text_chars={len(text)}", flush=True)
+    log.debug("llm(...) returned in %.2fs; out_text_chars=%d", dt, len(text))
     return text.strip()
 
     # print("[structured] ENTER _run_llm", flush=True)
@@ -236,22 +341,21 @@ def _run_llm(llm, prompt: str) -> str:
 
 # --- Prompting ---
 
-def _build_prompt(text: str) -> str:
-    key_lines = []
-    for k, spec in ALLOWED_KEYS.items():
-        if spec.get("unit"):
-            key_lines.append(f"- {k} ({spec.get('type')}, unit: {spec['unit']})")
-        else:
-            key_lines.append(f"- {k} ({spec.get('type')})")
-    allowed_block = "\n".join(key_lines)
+# ALLOWED_KEYS is constant, so the whole prompt around the document is too.
+# Built once at import; keeping it byte-identical across calls also lets
+# llama.cpp reuse the KV cache for the shared prefix between jobs.
+_ALLOWED_KEYS_BLOCK = "\n".join(
+    f"- {k} ({spec.get('type')}, unit: {spec['unit']})" if spec.get("unit") else f"- {k} ({spec.get('type')})"
+    for k, spec in ALLOWED_KEYS.items()
+)
 
-    return f"""You extract structured facts from a document.
+_PROMPT_PREFIX = f"""You extract structured facts from a document.
 
 ONLY output claims whose key is one of the allowed keys below.
 Do NOT invent new keys. Do NOT guess.
 
 Allowed keys:
-{allowed_block}
+{_ALLOWED_KEYS_BLOCK}
 
 Return ONLY valid JSON of this form:
 {{
@@ -261,10 +365,13 @@ Return ONLY valid JSON of this form:
 }}
 
 Document:
-\"\"\"{text}\"\"\"
+\"\"\""""
 
-JSON:
-"""
+_PROMPT_SUFFIX = '"""\n\nJSON:\n'
+
+
+def _build_prompt(text: str) -> str:
+    return _PROMPT_PREFIX + text + _PROMPT_SUFFIX
 
 
 def _build_repair_prompt(text: str, bad_output: str) -> str:
@@ -285,11 +392,12 @@ JSON:
 # --- JSON parsing / cleaning ---
 
 def _parse_json_loose(s: str) -> dict[str, Any]:
-    s = s.strip()
-    m = re.search(r"\{.*\}", s, flags=re.DOTALL)
-    if not m:
+    # Outermost {...}: same span as a greedy DOTALL regex, via two C-level scans
+    first = s.find("{")
+    last = s.rfind("}")
+    if first < 0 or last < first:
         raise ValueError("No JSON object found in model output")
-    return json.loads(m.group(0))
+    return json.loads(s[first : last + 1])
 
 
 def _coerce_claim(item: Any) -> ExtractedClaim:
@@ -1,6 +1,7 @@
 import re
 from sqlalchemy.orm import Session
 from backend.app import models
+from backend.app.services import text_cache
 
 _WS = re.compile(r"\s+")
 
@@ -11,9 +12,13 @@ def normalize_text_artifact(db: Session, artifact: models.Artifact) -> None:
     text = (artifact.text_content or "").strip()
     text = _WS.sub(" ", text)
 
+    digest = text_cache.segments_sha256([(0, "text:note", text)])
+    if digest == artifact.last_extracted_sha256:
+        return  # unchanged since the last run
+
     db.query(models.ArtifactTextSegment).filter(
         models.ArtifactTextSegment.artifact_id == artifact.id
-    ).delete()
+    ).delete(synchronize_session=False)
 
     seg = models.ArtifactTextSegment(
         artifact_id=artifact.id,
@@ -22,4 +27,5 @@ def normalize_text_artifact(db: Session, artifact: models.Artifact) -> None:
         source_ref="text:note",
     )
     db.add(seg)
+    artifact.last_extracted_sha256 = digest
     db.commit()
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from typing import Optional
+
+
+def clean_int(s: str | None) -> Optional[int]:
+    """
+    Parse an optional integer query/form value; "", whitespace or junk -> None.
+    HTML forms submit empty selects as "", which FastAPI's int params reject.
+    """
+    # Called with "" on most requests; check digits instead of catching ValueError
+    s = (s or "").strip()
+    digits = s[1:] if s[:1] in ("+", "-") else s
+    return int(s) if digits.isdecimal() else None
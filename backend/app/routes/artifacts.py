@@ -1,41 +1,43 @@
 from __future__ import annotations
 
-import hashlib
 from pathlib import Path
 from typing import Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 
 from backend.app import models
 from backend.app.db import get_db
 from backend.app.schemas import ArtifactOut
-from backend.app.services.storage import build_artifact_path, to_artifact_url
+from backend.app.services.storage import build_artifact_path, save_upload_file, to_artifact_url
 
 router = APIRouter()
 
 
-def _sha256(b: bytes) -> str:
-    h = hashlib.sha256()
-    h.update(b)
-    return h.hexdigest()
+# First matching mime prefix wins
+_MIME_PREFIX_KIND = (
+    ("audio/", "audio"),
+    ("video/", "video"),
+    ("image/", "image"),
+    ("application/pdf", "pdf"),
+)
 
 
 def _infer_kind(requested_kind: str, mime_type: Optional[str]) -> str:
     """
     If client leaves kind='file', infer a more specific kind from mime type so
-    registry dispatch works (image -> OCR, pdf -> PDF extractor).
+    registry dispatch works (image -> OCR, pdf -> PDF extractor, audio/video ->
+    transcription).
     """
     k = (requested_kind or "file").strip().lower()
-    mt = (mime_type or "").strip().lower()
-
     if k and k != "file":
         return k
 
-    if mt.startswith("image/"):
-        return "image"
-    if mt.startswith("application/pdf"):
-        return "pdf"
+    mt = (mime_type or "").strip().lower()
+    for prefix, kind in _MIME_PREFIX_KIND:
+        if mt.startswith(prefix):
+            return kind
     return "file"
 
 
@@ -56,17 +58,6 @@ async def upload_artifact(
     if not file.filename:
         raise HTTPException(status_code=400, detail="missing filename")
 
-    mt = (file.content_type or "").lower()
-    kind_norm = kind.strip().lower() or "file"
-
-    if kind_norm == "file":
-        if mt.startswith("audio/"):
-            kind_norm = "audio"
-        elif mt.startswith("video/"):
-            kind_norm = "video"
-        elif mt == "application/pdf":
-            kind_norm = "pdf"
-
     # Validate foreign keys if provided
     if industrial_park_id is not None and not db.get(models.IndustrialPark, industrial_park_id):
         raise HTTPException(status_code=404, detail="industrial_park not found")
@@ -79,42 +70,46 @@ async def upload_artifact(
 
     inferred_kind = _infer_kind(kind, file.content_type)
 
-    # Create DB row first so we have an artifact_id for the storage folder
-    artifact = models.Artifact(
-        industrial_park_id=industrial_park_id,
-        building_id=building_id,
-        kind=inferred_kind,
-        mime_type=file.content_type,
-        original_filename=file.filename,
-        storage_path="PENDING",
-        status="uploaded",
-    )
-    db.add(artifact)
+    # Create DB row first so we have an artifact_id for the storage folder.
+    # INSERT ... RETURNING id: no refresh SELECT, and the row is committed
+    # before the (possibly slow) upload so the write lock isn't held meanwhile.
+    artifact_id = db.execute(
+        insert(models.Artifact)
+        .values(
+            industrial_park_id=industrial_park_id,
+            building_id=building_id,
+            kind=inferred_kind,
+            mime_type=file.content_type,
+            original_filename=file.filename,
+            storage_path="PENDING",
+            status="uploaded",
+        )
+        .returning(models.Artifact.id)
+    ).scalar_one()
     db.commit()
-    db.refresh(artifact)
 
-    # Save to disk + compute hash
+    # Stream to disk + compute hash (never holds the whole file in memory)
     try:
-        contents = await file.read()
-        sha = _sha256(contents)
-        path: Path = build_artifact_path(artifact.id, file.filename)
-        path.write_bytes(contents)
+        path: Path = build_artifact_path(artifact_id, file.filename)
+        size, sha = await save_upload_file(file, path)
     finally:
         await file.close()
 
-    # Update DB with final storage path + metadata
-    artifact.storage_path = to_artifact_url(path)
-    artifact.bytes_size = len(contents)
-    artifact.sha256 = sha
-    db.add(artifact)
-    db.commit()
-    db.refresh(artifact)
-
-    # Enqueue AFTER storage_path is set (prevents worker race on PENDING)
+    # Update DB with final storage path + metadata; RETURNING hands back the
+    # row for the response in the same statement
+    artifact = db.execute(
+        update(models.Artifact)
+        .where(models.Artifact.id == artifact_id)
+        .values(storage_path=to_artifact_url(path), bytes_size=size, sha256=sha)
+        .returning(*models.Artifact.__table__.c)
+    ).one()
+
+    # Enqueue AFTER storage_path is set (prevents worker race on PENDING);
+    # its commit also commits the UPDATE above
     from backend.app.services.jobs import enqueue_job
-    enqueue_job(db, artifact.id, "extract_text")
+    enqueue_job(db, artifact_id, "extract_text")
 
-    return artifact
+    return artifact._asdict()
 
 
 @router.post("/text", response_model=ArtifactOut)
@@ -2,20 +2,28 @@ from __future__ import annotations
 
 import csv
 import io
+import itertools
+import sqlite3
+from collections import defaultdict
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Sequence
 
 from fastapi import APIRouter, Depends, Query
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
 from backend.app import models
-from backend.app.db import get_db
+from backend.app.db import DB_URL, get_db
 from backend.app.services.scoring import score_building
 
 router = APIRouter()
 
+# Rows fetched per round-trip when streaming large exports off the cursor
+EXPORT_YIELD_PER = 1000
+
+_AGG_FILTER_SUPPORTED = not DB_URL.startswith("sqlite") or sqlite3.sqlite_version_info >= (3, 30)
+
 
 def _dt_iso(dt: Optional[datetime]) -> str:
     return dt.isoformat() if dt else ""
@@ -27,10 +35,21 @@ def _as_text(v) -> str:
     return str(v)
 
 
-def _csv_response(output: io.StringIO, filename: str) -> Response:
-    csv_bytes = output.getvalue().encode("utf-8")
-    return Response(
-        content=csv_bytes,
+def _csv_iter(header: Sequence, rows: Iterable[Sequence]) -> Iterator[bytes]:
+    # One small reusable buffer; each row is encoded and handed off as soon
+    # as it is written instead of accumulating the whole export in memory.
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in itertools.chain((header,), rows):
+        writer.writerow(row)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate(0)
+
+
+def _csv_response(header: Sequence, rows: Iterable[Sequence], filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        _csv_iter(header, rows),
         media_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -54,61 +73,73 @@ def export_building_summaries_csv(
       - claim count (claims joined via artifact -> building)
     """
 
-    parks_by_id = {p.id: p for p in db.query(models.IndustrialPark).all()}
-
-    bq = db.query(models.Building)
+    # Plain rows with just the printed columns; no ORM instances to hydrate
+    bld = models.Building
+    bq = db.query(bld.id, bld.industrial_park_id, bld.name, bld.address, bld.created_at)
     if park_id is not None:
-        bq = bq.filter(models.Building.industrial_park_id == park_id)
-    buildings = bq.order_by(models.Building.industrial_park_id, models.Building.id).all()
+        bq = bq.filter(bld.industrial_park_id == park_id)
+    buildings = bq.order_by(bld.industrial_park_id, bld.id).all()
+
+    # Only the parks these buildings belong to, and only the columns we print
+    park_ids = {b.industrial_park_id for b in buildings}
+    parks_by_id = {}
+    if park_ids:
+        p = models.IndustrialPark
+        parks_by_id = {
+            r.id: r
+            for r in db.query(p.id, p.name, p.location).filter(p.id.in_(park_ids))
+        }
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    writer.writerow(
-        [
-            "park_id",
-            "park_name",
-            "park_location",
-            "building_id",
-            "building_name",
-            "building_address",
-            "readiness_score",
-            "confidence",
-            "top_drivers",
-            "artifact_count",
-            "text_count",
-            "image_count",
-            "pdf_count",
-            "audio_count",
-            "video_count",
-            "last_artifact_at",
-            "claim_count",
-            "building_created_at",
-        ]
+    filename = (
+        "powertown_building_export.csv"
+        if park_id is None
+        else f"powertown_building_export_park_{park_id}.csv"
     )
+    header = [
+        "park_id",
+        "park_name",
+        "park_location",
+        "building_id",
+        "building_name",
+        "building_address",
+        "readiness_score",
+        "confidence",
+        "top_drivers",
+        "artifact_count",
+        "text_count",
+        "image_count",
+        "pdf_count",
+        "audio_count",
+        "video_count",
+        "last_artifact_at",
+        "claim_count",
+        "building_created_at",
+    ]
 
     building_ids = [b.id for b in buildings]
     if not building_ids:
-        filename = (
-            "powertown_building_export.csv"
-            if park_id is None
-            else f"powertown_building_export_park_{park_id}.csv"
-        )
-        return _csv_response(output, filename)
+        return _csv_response(header, (), filename)
 
     a = models.Artifact
 
-    # ✅ IMPORTANT FIX:
-    # Use sqlalchemy.case (imported as case), NOT func.case.
+    # COUNT(*) FILTER (WHERE ...) per kind (PostgreSQL, SQLite >= 3.30); older
+    # SQLite falls back to SUM(CASE ...). Use sqlalchemy.case, NOT func.case.
+    kind = func.lower(a.kind)
+
+    def _kind_count(cond):
+        if _AGG_FILTER_SUPPORTED:
+            return func.count().filter(cond)
+        return func.sum(case((cond, 1), else_=0))
+
     agg_rows = (
         db.query(
             a.building_id.label("building_id"),
             func.count(a.id).label("artifact_count"),
-            func.sum(case((func.lower(a.kind) == "text", 1), else_=0)).label("text_count"),
-            func.sum(case((func.lower(a.kind).in_(("image", "photo")), 1), else_=0)).label("image_count"),
-            func.sum(case((func.lower(a.kind) == "pdf", 1), else_=0)).label("pdf_count"),
-            func.sum(case((func.lower(a.kind) == "audio", 1), else_=0)).label("audio_count"),
-            func.sum(case((func.lower(a.kind) == "video", 1), else_=0)).label("video_count"),
+            _kind_count(kind == "text").label("text_count"),
+            _kind_count(kind.in_(("image", "photo"))).label("image_count"),
+            _kind_count(kind == "pdf").label("pdf_count"),
+            _kind_count(kind == "audio").label("audio_count"),
+            _kind_count(kind == "video").label("video_count"),
             func.max(a.created_at).label("last_artifact_at"),
         )
         .filter(a.building_id.in_(building_ids))
@@ -131,41 +162,35 @@ def export_building_summaries_csv(
     )
     claims_by_building = {r.building_id: int(r.claim_count or 0) for r in claim_rows}
 
-    # Gather extracted text segments per building
+    # Gather extracted text segments + note artifacts (text_content) per
+    # building in one pass; buildings without text fall back to ().
     seg = models.ArtifactTextSegment
     seg_rows = (
         db.query(a.building_id, seg.text)
         .join(a, a.id == seg.artifact_id)
         .filter(a.building_id.in_(building_ids))
         .order_by(a.building_id.asc(), seg.segment_index.asc())
-        .all()
+        .yield_per(EXPORT_YIELD_PER)
     )
-
-    texts_by_building: dict[int, list[str]] = {bid: [] for bid in building_ids}
-    for bid, text in seg_rows:
-        if text:
-            texts_by_building[bid].append(text)
-
-    # Also include note artifacts (text_content)
     note_rows = (
         db.query(a.building_id, a.text_content)
         .filter(a.building_id.in_(building_ids))
         .filter(func.lower(a.kind) == "text")
-        .all()
     )
-    for bid, text in note_rows:
+
+    texts_by_building: defaultdict[int, list[str]] = defaultdict(list)
+    for bid, text in itertools.chain(seg_rows, note_rows):
         if text:
             texts_by_building[bid].append(text)
 
-    for b in buildings:
-        park = parks_by_id.get(b.industrial_park_id)
-        agg = agg_by_building.get(b.id)
+    def _rows():
+        for b in buildings:
+            park = parks_by_id.get(b.industrial_park_id)
+            agg = agg_by_building.get(b.id)
 
-        building_texts = texts_by_building.get(b.id, [])
-        score = score_building(building_texts)
+            score = score_building(texts_by_building.get(b.id, ()))
 
-        writer.writerow(
-            [
+            yield [
                 b.industrial_park_id,
                 park.name if park else "",
                 (park.location if park else "") or "",
@@ -185,14 +210,8 @@ def export_building_summaries_csv(
                 int(claims_by_building.get(b.id, 0) or 0),
                 _dt_iso(getattr(b, "created_at", None)),
             ]
-        )
 
-    filename = (
-        "powertown_building_export.csv"
-        if park_id is None
-        else f"powertown_building_export_park_{park_id}.csv"
-    )
-    return _csv_response(output, filename)
+    return _csv_response(header, _rows(), filename)
 
 
 # ----------------------------------------------------------------------
@@ -237,55 +256,52 @@ def export_artifacts_csv(
     if building_id is not None:
         q = q.filter(a.building_id == building_id)
 
-    q = q.order_by(a.created_at.desc(), a.id.desc())
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
+    # Stream rows from the cursor in batches rather than loading the full result
+    q = q.order_by(a.created_at.desc(), a.id.desc()).yield_per(EXPORT_YIELD_PER)
+
+    header = [
+        "artifact_id",
+        "park_id",
+        "park_name",
+        "building_id",
+        "building_name",
+        "kind",
+        "mime_type",
+        "original_filename",
+        "storage_path",
+        "bytes_size",
+        "sha256",
+        "status",
+        "error_message",
+        "created_at",
+    ]
+
+    rows = (
         [
-            "artifact_id",
-            "park_id",
-            "park_name",
-            "building_id",
-            "building_name",
-            "kind",
-            "mime_type",
-            "original_filename",
-            "storage_path",
-            "bytes_size",
-            "sha256",
-            "status",
-            "error_message",
-            "created_at",
+            r.artifact_id,
+            r.industrial_park_id,
+            _as_text(r.park_name),
+            r.building_id,
+            _as_text(r.building_name),
+            _as_text(r.kind),
+            _as_text(r.mime_type),
+            _as_text(r.original_filename),
+            _as_text(r.storage_path),
+            _as_text(r.bytes_size),
+            _as_text(r.sha256),
+            _as_text(r.status),
+            _as_text(r.error_message),
+            _dt_iso(r.created_at),
         ]
+        for r in q
     )
 
-    for r in q.all():
-        writer.writerow(
-            [
-                r.artifact_id,
-                r.industrial_park_id,
-                _as_text(r.park_name),
-                r.building_id,
-                _as_text(r.building_name),
-                _as_text(r.kind),
-                _as_text(r.mime_type),
-                _as_text(r.original_filename),
-                _as_text(r.storage_path),
-                _as_text(r.bytes_size),
-                _as_text(r.sha256),
-                _as_text(r.status),
-                _as_text(r.error_message),
-                _dt_iso(r.created_at),
-            ]
-        )
-
     filename = "powertown_artifacts.csv"
     if building_id is not None:
         filename = f"powertown_artifacts_building_{building_id}.csv"
     elif park_id is not None:
         filename = f"powertown_artifacts_park_{park_id}.csv"
-    return _csv_response(output, filename)
+    return _csv_response(header, rows, filename)
 
 
 # ----------------------------------------------------------------------
@@ -334,45 +350,41 @@ def export_claims_csv(
     if park_id is not None:
         q = q.filter(a.industrial_park_id == park_id)
 
-    q = q.order_by(c.confidence.desc().nullslast(), c.id.asc())
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
+    q = q.order_by(c.confidence.desc().nullslast(), c.id.asc()).yield_per(EXPORT_YIELD_PER)
+
+    header = [
+        "claim_id",
+        "artifact_id",
+        "park_id",
+        "park_name",
+        "building_id",
+        "building_name",
+        "field_key",
+        "value_json",
+        "unit",
+        "confidence",
+        "source_ref",
+        "created_at",
+    ]
+
+    rows = (
         [
-            "claim_id",
-            "artifact_id",
-            "park_id",
-            "park_name",
-            "building_id",
-            "building_name",
-            "field_key",
-            "value_json",
-            "unit",
-            "confidence",
-            "source_ref",
-            "created_at",
+            r.claim_id,
+            r.artifact_id,
+            r.industrial_park_id,
+            _as_text(r.park_name),
+            r.building_id,
+            _as_text(r.building_name),
+            _as_text(r.field_key),
+            _as_text(r.value_json),
+            _as_text(r.unit),
+            _as_text(r.confidence),
+            _as_text(r.source_ref),
+            _dt_iso(r.created_at),
         ]
+        for r in q
     )
 
-    for r in q.all():
-        writer.writerow(
-            [
-                r.claim_id,
-                r.artifact_id,
-                r.industrial_park_id,
-                _as_text(r.park_name),
-                r.building_id,
-                _as_text(r.building_name),
-                _as_text(r.field_key),
-                _as_text(r.value_json),
-                _as_text(r.unit),
-                _as_text(r.confidence),
-                _as_text(r.source_ref),
-                _dt_iso(r.created_at),
-            ]
-        )
-
     filename = "powertown_claims.csv"
     if artifact_id is not None:
         filename = f"powertown_claims_artifact_{artifact_id}.csv"
@@ -381,4 +393,4 @@ def export_claims_csv(
     elif park_id is not None:
         filename = f"powertown_claims_park_{park_id}.csv"
 
-    return _csv_response(output, filename)
+    return _csv_response(header, rows, filename)
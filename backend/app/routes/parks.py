@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from backend.app import models
 from backend.app.db import get_db
 from backend.app.schemas import IndustrialParkCreate, IndustrialParkOut
+from backend.app.services.park_options import invalidate_park_options
 
 router = APIRouter()
 
@@ -18,4 +19,5 @@ def create_industrial_park(
     db.add(park)
     db.commit()
     db.refresh(park)
+    invalidate_park_options()
     return park
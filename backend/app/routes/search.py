@@ -1,21 +1,47 @@
 from __future__ import annotations
 
+import functools
+import itertools
 import json
+import operator
 import re
 from typing import Optional, Any
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import case, func, literal, null, or_, select, union_all
+
+try:
+    import orjson  # optional: faster value_json decoding
+except ImportError:
+    orjson = None
 
 from backend.app.db import get_db
 from backend.app import models
 from backend.app.processors.structured import get_llm, run_llm, parse_json_loose
 from backend.app.processors.structured_keys import ALLOWED_KEYS
+from backend.app.services.segment_search import segment_text_ilike
 
 router = APIRouter()
 
+# Parsed filters per distinct query text; repeat NL searches skip the LLM call
+NL_FILTER_CACHE_SIZE = 1024
+
+
+class _UnparsedFilters(Exception):
+    """LLM output wasn't a JSON object (raised so lru_cache doesn't keep it)."""
+
+
 def _nl_query_to_filters(q: str) -> dict[str, Any]:
+    try:
+        # Decoded per call: callers get their own dict, never the cached one
+        return json.loads(_nl_filters_json(q))
+    except _UnparsedFilters:
+        return {"must": [], "range": [], "keywords": [q]}
+
+
+@functools.lru_cache(maxsize=NL_FILTER_CACHE_SIZE)
+def _nl_filters_json(q: str) -> str:
     keys = list(ALLOWED_KEYS.keys())
     prompt = f"""Convert the user's query into JSON filters over claim keys.
 
@@ -44,24 +70,97 @@ JSON:
     try:
         data = parse_json_loose(out)
     except Exception as e:
-        return {"must": [], "range": [], "keywords": [q]}
+        raise _UnparsedFilters() from e
 
     if not isinstance(data, dict):
-        return {"must": [], "range": [], "keywords": [q]}
+        raise _UnparsedFilters()
     data.setdefault("must", [])
     data.setdefault("range", [])
     data.setdefault("keywords", [])
-    return data
+    return json.dumps(data)
 
 
-def _extract_claim_value(value_json: str) -> Any:
+def _decode_claim_json(value_json: str) -> Any:
+    """Decoded value_json, or the raw string if it isn't valid JSON."""
+    if orjson is not None:
+        try:
+            return orjson.loads(value_json)
+        except orjson.JSONDecodeError:
+            pass  # json.loads also accepts NaN/Infinity, which json.dumps can emit
     try:
-        v = json.loads(value_json)
+        return json.loads(value_json)
     except Exception:
         return value_json
-    if isinstance(v, dict) and "value" in v:
-        return v["value"]
-    return v
+
+
+def _claim_value(decoded: Any) -> Any:
+    if isinstance(decoded, dict) and "value" in decoded:
+        return decoded["value"]
+    return decoded
+
+
+_RANGE_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def _claim_value_sql(json_fn: str = "json_extract", raw=None):
+    # SQL mirror of _claim_value(_decode_claim_json(...)) (SQLite JSON1): the "value" member of
+    # a JSON object, else the whole JSON value, else the raw text.
+    # json_fn="json_type" gives the JSON type of that same value instead.
+    vj = models.Claim.value_json
+    fn = getattr(func, json_fn)
+    return case(
+        (func.json_valid(vj) == 0, vj if raw is None else raw),
+        (func.json_type(vj, "$.value").is_not(None), fn(vj, "$.value")),
+        else_=fn(vj, "$"),
+    )
+
+
+def _claim_filter_clauses(filt: dict[str, Any]) -> list:
+    """
+    Push the "=" and range filters into WHERE clauses. They only prune rows
+    matches() would reject; "~" and anything not expressible here is left to
+    the Python check that still runs on every returned row.
+    """
+    claim = models.Claim
+    value = _claim_value_sql()
+    value_type = _claim_value_sql("json_type", raw=literal("text"))
+    clauses = []
+
+    for m in filt.get("must", []):
+        if not isinstance(m, dict) or not isinstance(m.get("key"), str):
+            continue
+        if m.get("op", "=") != "=":
+            continue
+        target = m.get("value")
+        if target is None:
+            cond = value.is_(None)
+        elif isinstance(target, (str, int, float)):
+            cond = value == target
+        else:
+            continue
+        clauses.append(or_(claim.field_key != m["key"], cond))
+
+    for r in filt.get("range", []):
+        if not isinstance(r, dict) or not isinstance(r.get("key"), str):
+            continue
+        op = _RANGE_OPS.get(r.get("op"))
+        try:
+            thr = float(r.get("value"))
+        except Exception:
+            continue
+        if op is None:
+            continue
+        # Only JSON numbers are decided here; strings like "12.5" still go
+        # through float() in matches().
+        clauses.append(
+            or_(
+                claim.field_key != r["key"],
+                value_type.not_in(("integer", "real")),
+                op(value, thr),
+            )
+        )
+
+    return clauses
 
 
 @router.get("")
@@ -86,10 +185,11 @@ def search(
         cq = db.query(models.Claim)
         if building_id is not None:
             cq = cq.filter(models.Claim.building_id == building_id)
-        claims_all = list(cq.all())
+        if db.get_bind().dialect.name == "sqlite":
+            cq = cq.filter(*_claim_filter_clauses(filt))
+        cq = cq.order_by(models.Claim.confidence.desc(), models.Claim.id.asc())
 
-        def matches(claim: models.Claim) -> bool:
-            v = _extract_claim_value(claim.value_json)
+        def matches(claim: models.Claim, v: Any) -> bool:
 
             # must filters
             for m in filt.get("must", []):
@@ -128,9 +228,12 @@ def search(
 
             return True
 
-        claim_hits = [c for c in claims_all if matches(c)]
-        claim_hits.sort(key=lambda c: c.confidence or 0.0, reverse=True)
-        claim_hits = claim_hits[:limit]
+        # Already in confidence order, so stop reading once `limit` rows pass.
+        # value_json is decoded once per row and reused for the response.
+        decoded = ((c, _decode_claim_json(c.value_json)) for c in cq.yield_per(500))
+        claim_hits = list(
+            itertools.islice(((c, d) for c, d in decoded if matches(c, _claim_value(d))), limit)
+        )
 
         return {
             "q": q,
@@ -142,55 +245,77 @@ def search(
                 {
                     "artifact_id": c.artifact_id,
                     "field_key": c.field_key,
-                    "value": json.loads(c.value_json),
+                    "value": d,
                     "confidence": c.confidence,
                 }
-                for c in claim_hits
+                for c, d in claim_hits
             ],
         }
 
-    # default keyword mode
+    return _keyword_search(q, building_id, limit, db)
+
+
+def _keyword_search(q: str, building_id: Optional[int], limit: int, db: Session) -> dict[str, Any]:
     qlike = f"%{q.lower()}%"
+    a, c, seg = models.Artifact, models.Claim, models.ArtifactTextSegment
 
-    aq = db.query(models.Artifact)
-    if building_id is not None:
-        aq = aq.filter(models.Artifact.building_id == building_id)
-    aq = aq.filter(
-        or_(
-            models.Artifact.original_filename.ilike(qlike),
-            models.Artifact.kind.ilike(qlike),
-            models.Artifact.mime_type.ilike(qlike),
+    # Artifacts, claims and segments come back from one UNION ALL round-trip.
+    # Each branch keeps its own ORDER BY + LIMIT inside a subquery and numbers
+    # its rows, and rows are told apart by the "tag" column:
+    #   artifact: (id, building_id, kind, original_filename, storage_path, -)
+    #   claim:    (artifact_id, -, field_key, value_json, -, confidence)
+    #   segment:  (artifact_id, segment_index, snippet, -, -, -)
+    def _branch(tag: str, cols: list, stmt, order_by=()):
+        cols = cols + [null()] * (6 - len(cols))
+        labelled = [col.label(f"c{i}") for i, col in enumerate(cols)]
+        stmt = stmt.add_columns(
+            literal(tag).label("tag"),
+            *labelled,
+            func.row_number().over(order_by=order_by or None).label("pos"),
         )
-    ).order_by(models.Artifact.created_at.desc()).limit(limit)
-    artifacts = list(aq.all())
+        if order_by:
+            stmt = stmt.order_by(*order_by)
+        sub = stmt.limit(limit).subquery()
+        return select(sub)
 
-    cq = db.query(models.Claim)
+    aq = select().select_from(a).where(
+        or_(a.original_filename.ilike(qlike), a.kind.ilike(qlike), a.mime_type.ilike(qlike))
+    )
+    cq = select().select_from(c).where(or_(c.field_key.ilike(qlike), c.value_json.ilike(qlike)))
+    sq = select().select_from(seg).where(segment_text_ilike(qlike))
     if building_id is not None:
-        cq = cq.filter(models.Claim.building_id == building_id)
-    cq = cq.filter(or_(models.Claim.field_key.ilike(qlike), models.Claim.value_json.ilike(qlike))) \
-           .order_by(models.Claim.confidence.desc()).limit(limit)
-    claims = list(cq.all())
+        aq = aq.where(a.building_id == building_id)
+        cq = cq.where(c.building_id == building_id)
+        sq = sq.join(a, a.id == seg.artifact_id).where(a.building_id == building_id)
 
-    sq = db.query(models.ArtifactTextSegment).filter(models.ArtifactTextSegment.text.ilike(qlike))
-    if building_id is not None:
-        sq = sq.join(models.Artifact, models.Artifact.id == models.ArtifactTextSegment.artifact_id) \
-               .filter(models.Artifact.building_id == building_id)
-    sq = sq.limit(limit)
-    segments = list(sq.all())
-
-    return {
-        "q": q,
-        "mode": "kw",
-        "artifacts": [
-            {"id": a.id, "building_id": a.building_id, "kind": a.kind, "filename": a.original_filename, "storage_path": a.storage_path}
-            for a in artifacts
-        ],
-        "claims": [
-            {"artifact_id": c.artifact_id, "field_key": c.field_key, "value": json.loads(c.value_json), "confidence": c.confidence}
-            for c in claims
-        ],
-        "segments": [
-            {"artifact_id": s.artifact_id, "segment_index": s.segment_index, "snippet": (s.text or "")[:220]}
-            for s in segments
-        ],
-    }
+    stmt = union_all(
+        _branch(
+            "artifact",
+            [a.id, a.building_id, a.kind, a.original_filename, a.storage_path],
+            aq,
+            (a.created_at.desc(),),
+        ),
+        _branch(
+            "claim",
+            [c.artifact_id, null(), c.field_key, c.value_json, null(), c.confidence],
+            cq,
+            (c.confidence.desc(),),
+        ),
+        _branch("segment", [seg.artifact_id, seg.segment_index, func.substr(seg.text, 1, 220)], sq),
+    )
+    sub = stmt.subquery()
+    rows = db.execute(select(sub).order_by(sub.c.tag, sub.c.pos)).all()
+
+    out: dict[str, Any] = {"q": q, "mode": "kw", "artifacts": [], "claims": [], "segments": []}
+    for r in rows:
+        if r.tag == "artifact":
+            out["artifacts"].append(
+                {"id": r.c0, "building_id": r.c1, "kind": r.c2, "filename": r.c3, "storage_path": r.c4}
+            )
+        elif r.tag == "claim":
+            out["claims"].append(
+                {"artifact_id": r.c0, "field_key": r.c2, "value": _decode_claim_json(r.c3), "confidence": r.c5}
+            )
+        else:
+            out["segments"].append({"artifact_id": r.c0, "segment_index": r.c1, "snippet": r.c2 or ""})
+    return out
@@ -1,60 +1,46 @@
 from collections import defaultdict
 
 from typing import Optional, List, Any
+import asyncio
+import functools
+import heapq
 import html
+import re
+from contextlib import nullcontext
 
 from starlette.status import HTTP_303_SEE_OTHER
-from backend.app.services.jobs import enqueue_job
+from backend.app.services.jobs import enqueue_jobs
 
 from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, Query
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Bundle, Session, raiseload
 from sqlalchemy import or_
-from sqlalchemy import func
+from sqlalchemy import func, select
 
 from backend.app import models
 from backend.app.db import get_db
-from backend.app.services.scoring_cache import get_or_compute_building_score
-from backend.app.services.storage import build_artifact_path, to_artifact_url
+from backend.app.routes._params import clean_int
+from backend.app.templating import templates
+from backend.app.services.scoring_cache import (
+    get_or_compute_building_score,
+    get_or_compute_building_scores,
+)
+from backend.app.services.segment_search import segment_text_ilike, segment_text_search
+from backend.app.services.ingest import create_file_artifacts, zip_member_sources
+from backend.app.services.park_cards import park_cards
+from backend.app.services.park_options import invalidate_park_options, park_options
 
 import zipfile
-from pathlib import Path
 import io
 
 
 
-templates = Jinja2Templates(directory="backend/app/templates")
 router = APIRouter()
 
 
-def _clean_int(s: str | None) -> Optional[int]:
-    if not s:
-        return None
-    s = s.strip()
-    if not s:
-        return None
-    try:
-        return int(s)
-    except Exception:
-        return None
-
-
-def _infer_kind_from_upload(u: UploadFile) -> str:
-    c = (u.content_type or "").lower()
-    name = (u.filename or "").lower()
-    if c.startswith("image/") or name.endswith((".png", ".jpg", ".jpeg", ".webp", ".gif")):
-        return "image"
-    if c.startswith("audio/") or name.endswith((".mp3", ".wav", ".m4a", ".aac", ".ogg")):
-        return "audio"
-    if c == "application/pdf" or name.endswith(".pdf"):
-        return "pdf"
-    return "file"
-
-
 @router.get("/")
 def root():
     return RedirectResponse(url="/review")
@@ -62,29 +48,7 @@ def root():
 
 @router.get("/review")
 def review_home(request: Request, db: Session = Depends(get_db)):
-    parks = db.query(models.IndustrialPark).order_by(models.IndustrialPark.id.desc()).all()
-
-    park_cards = []
-    for p in parks:
-        buildings = db.query(models.Building).filter(models.Building.industrial_park_id == p.id).all()
-        building_ids = [b.id for b in buildings]
-
-        q = db.query(models.Artifact).filter(models.Artifact.industrial_park_id == p.id)
-        if building_ids:
-            q = q.union_all(db.query(models.Artifact).filter(models.Artifact.building_id.in_(building_ids)))
-        artifacts = q.order_by(models.Artifact.created_at.desc()).all()
-
-        last_activity_at = artifacts[0].created_at if artifacts else None
-        park_cards.append(
-            {
-                "park": p,
-                "building_count": len(buildings),
-                "artifact_count": len(artifacts),
-                "last_activity_at": last_activity_at,
-            }
-        )
-
-    return templates.TemplateResponse("review_home.html", {"request": request, "park_cards": park_cards})
+    return templates.TemplateResponse("review_home.html", {"request": request, "park_cards": park_cards(db)})
 
 @router.get("/review/parks/{park_id}")
 def review_park(
@@ -103,6 +67,7 @@ def review_park(
     # --- Limits (default top 10) ---
     BUILDINGS_LIMIT = 10
     ARTIFACTS_LIMIT = 10
+    ARTIFACTS_SHOW_ALL_CAP = 2000
     show_all_buildings = bool(all_buildings)
     show_all_artifacts = bool(all_artifacts)
 
@@ -110,26 +75,55 @@ def review_park(
     q_like = f"%{q_norm}%" if q_norm else None
 
     # --- Buildings query ---
-    bq = db.query(models.Building).filter(models.Building.industrial_park_id == park_id)
-    if status:
-        bq = bq.filter(models.Building.status == status)
-
-    if q_norm:
-        # lightweight filtering: name/address
-        bq = bq.filter(
-            or_(
-                models.Building.name.ilike(q_like),
-                models.Building.address.ilike(q_like),
-            )
+    # Every building in the park, loaded once with its artifact count: it
+    # backs the unfiltered building list, the top-candidate scoring and the
+    # artifact list's name lookup below. Templates only read columns, so
+    # relationships are raiseload'd rather than lazily fetched per row.
+    n_artifacts = (
+        select(func.count(models.Artifact.id))
+        .where(models.Artifact.building_id == models.Building.id)
+        .correlate(models.Building)
+        .scalar_subquery()
+    )
+    park_rows = (
+        db.query(models.Building, n_artifacts)
+        .options(raiseload("*"))
+        .filter(models.Building.industrial_park_id == park_id)
+        .order_by(models.Building.id.desc())
+        .all()
+    )
+    all_bldgs = [b for b, _ in park_rows]
+    artifact_counts = {b.id: n for b, n in park_rows}
+
+    if status or q_norm:
+        bq = (
+            db.query(models.Building)
+            .options(raiseload("*"))
+            .filter(models.Building.industrial_park_id == park_id)
         )
+        if status:
+            bq = bq.filter(models.Building.status == status)
+
+        if q_norm:
+            # lightweight filtering: name/address
+            bq = bq.filter(
+                or_(
+                    models.Building.name.ilike(q_like),
+                    models.Building.address.ilike(q_like),
+                )
+            )
 
-    buildings_total = bq.count()
-
-    # Choose which buildings to display
-    if show_all_buildings:
-        buildings = bq.order_by(models.Building.id.desc()).all()
+        # Choose which buildings to display; the total rides along on each row
+        bq = bq.add_columns(func.count().over().label("total")).order_by(models.Building.id.desc())
+        if not show_all_buildings:
+            bq = bq.limit(BUILDINGS_LIMIT)
+        rows = bq.all()
+        buildings = [b for b, _ in rows]
+        buildings_total = rows[0].total if rows else 0
     else:
-        buildings = bq.order_by(models.Building.id.desc()).limit(BUILDINGS_LIMIT).all()
+        # Unfiltered: the park's buildings are already loaded in display order
+        buildings_total = len(all_bldgs)
+        buildings = all_bldgs if show_all_buildings else all_bldgs[:BUILDINGS_LIMIT]
 
     buildings_shown = len(buildings)
 
@@ -137,19 +131,9 @@ def review_park(
     building_cards = []
     building_ids = [b.id for b in buildings]
 
-    # Count artifacts per building efficiently (only for displayed buildings)
-    artifact_counts = {}
-    if building_ids:
-        rows = (
-            db.query(models.Artifact.building_id, func.count(models.Artifact.id))
-            .filter(models.Artifact.building_id.in_(building_ids))
-            .group_by(models.Artifact.building_id)
-            .all()
-        )
-        artifact_counts = {bid: cnt for bid, cnt in rows}
-
+    scores = get_or_compute_building_scores(db, building_ids)
     for b in buildings:
-        score = get_or_compute_building_score(db, b.id)
+        score = scores[b.id]
         building_cards.append(
             {
                 "building": b,
@@ -168,36 +152,46 @@ def review_park(
         if show_all_buildings or q_norm:
             candidate_buildings = buildings
         else:
-            candidate_buildings = (
-                db.query(models.Building)
-                .filter(models.Building.industrial_park_id == park_id)
-                .order_by(models.Building.id.desc())
-                .all()
-            )
+            candidate_buildings = all_bldgs
 
         candidate_cards = []
+        # Displayed buildings were scored above; only fetch the rest
+        candidate_scores = {
+            **scores,
+            **get_or_compute_building_scores(
+                db, [b.id for b in candidate_buildings if b.id not in scores]
+            ),
+        }
         # artifact counts for candidates (optional; not needed for top scoring)
         for b in candidate_buildings:
-            score = get_or_compute_building_score(db, b.id)
+            score = candidate_scores[b.id]
             candidate_cards.append({"building": b, "score": score, "artifact_count": 0})
 
-        top_candidates = sorted(candidate_cards, key=lambda c: c["score"].score, reverse=True)[:5]
+        # Same result (ties included) as sorted(..., reverse=True)[:5], without the full sort
+        top_candidates = heapq.nlargest(5, candidate_cards, key=lambda c: c["score"].score)
 
     # building lookup for artifacts list display
     # Use *all* buildings in the park for name lookup so artifacts link correctly.
-    all_bldgs = (
-        db.query(models.Building)
-        .filter(models.Building.industrial_park_id == park_id)
-        .all()
-    )
     building_by_id = {b.id: b for b in all_bldgs}
     all_ids = list(building_by_id.keys())
 
     # --- Artifacts query (park or buildings in park) ---
-    aq = db.query(models.Artifact).filter(
+    # Plain rows with only the columns the list renders: no identity-map or
+    # attribute instrumentation per artifact, which adds up under show-all.
+    art = models.Artifact
+    aq = db.query(
+        art.id,
+        art.created_at,
+        art.kind,
+        art.building_id,
+        art.original_filename,
+        art.storage_path,
+        # Page and total in one statement: count(*) OVER () is computed before LIMIT
+        func.count().over().label("total"),
+    ).filter(
         or_(
-            models.Artifact.industrial_park_id == park_id,
-            models.Artifact.building_id.in_(all_ids) if all_ids else False,
+            art.industrial_park_id == park_id,
+            art.building_id.in_(all_ids) if all_ids else False,
         )
     )
 
@@ -205,17 +199,17 @@ def review_park(
         # lightweight artifact filtering: filename; (optionally) text_content
         aq = aq.filter(
             or_(
-                models.Artifact.original_filename.ilike(q_like),
-                models.Artifact.text_content.ilike(q_like),
+                art.original_filename.ilike(q_like),
+                art.text_content.ilike(q_like),
             )
         )
 
-    artifacts_total = aq.count()
-
-    if show_all_artifacts:
-        recent_artifacts = aq.order_by(models.Artifact.created_at.desc()).all()
-    else:
-        recent_artifacts = aq.order_by(models.Artifact.created_at.desc()).limit(ARTIFACTS_LIMIT).all()
+    # "Show all" is still bounded; the page reports shown vs. total
+    aq = aq.order_by(art.created_at.desc()).limit(
+        ARTIFACTS_SHOW_ALL_CAP if show_all_artifacts else ARTIFACTS_LIMIT
+    )
+    recent_artifacts = aq.all()
+    artifacts_total = recent_artifacts[0].total if recent_artifacts else 0
 
     artifacts_shown = len(recent_artifacts)
 
@@ -238,27 +232,24 @@ def review_park(
         },
     )
 
-def _safe_zip_members(zf: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
-    members: list[zipfile.ZipInfo] = []
-    for info in zf.infolist():
-        if info.is_dir():
-            continue
-        name = (info.filename or "").replace("\\", "/").lstrip("/")
-        # zip-slip protection
-        if ".." in name.split("/"):
-            continue
-        members.append(info)
-    return members
-
 @router.get("/review/buildings/{building_id}")
 def review_building(building_id: int, request: Request, db: Session = Depends(get_db)):
     building = db.get(models.Building, building_id)
     if not building:
         raise HTTPException(status_code=404, detail="building not found")
 
-    # Artifacts (newest first)
+    # Artifacts (newest first), as plain rows of the columns the page shows
+    art = models.Artifact
     artifacts = (
-        db.query(models.Artifact)
+        db.query(
+            art.id,
+            art.kind,
+            art.mime_type,
+            art.original_filename,
+            art.storage_path,
+            art.text_content,
+            art.created_at,
+        )
         .filter(models.Artifact.building_id == building_id)
         .order_by(models.Artifact.created_at.desc(), models.Artifact.id.desc())
         .all()
@@ -348,8 +339,7 @@ def set_building_status(building_id: int, status: str = Form(...), db: Session =
 
 @router.get("/capture")
 def capture_form(request: Request, db: Session = Depends(get_db)):
-    parks = db.query(models.IndustrialPark).order_by(models.IndustrialPark.id.desc()).all()
-    return templates.TemplateResponse("capture.html", {"request": request, "parks": parks})
+    return templates.TemplateResponse("capture.html", {"request": request, "parks": park_options(db)})
 
 
 @router.post("/capture")
@@ -368,172 +358,157 @@ async def capture_submit(
 
     db: Session = Depends(get_db),
 ):
-    # --- choose/create park ---
-    park: Optional[models.IndustrialPark] = None
-    if park_id:
-        park = db.get(models.IndustrialPark, int(park_id))
-        if not park:
-            raise HTTPException(status_code=404, detail="site not found")
-    else:
-        pn = (park_name or "").strip()
-        if not pn:
-            raise HTTPException(status_code=400, detail="provide park_id or park_name")
-        park = models.IndustrialPark(name=pn, location=(park_location or "").strip() or None)
-        db.add(park)
-        db.commit()
-        db.refresh(park)
-
-    # --- create building ---
-    building = models.Building(
-        industrial_park_id=park.id,
-        name=building_name.strip(),
-        address=(building_address or "").strip() or None,
-    )
-    db.add(building)
-    db.commit()
-    db.refresh(building)
-
-    # --- optional note as a text artifact ---
-    if note_text and note_text.strip():
-        a = models.Artifact(
-            industrial_park_id=park.id,
-            building_id=building.id,
-            kind="text",
-            mime_type="text/plain",
-            original_filename=None,
-            storage_path=None,
-            text_content=note_text,
-            status="uploaded",
-        )
-        db.add(a)
-        db.commit()
-        db.refresh(a)
-        enqueue_job(db, a.id, "extract_text")
-
-    # --- helper to create a file artifact from bytes ---
-    def _guess_kind(mime: Optional[str], filename: str) -> str:
-        m = (mime or "").lower()
-        fn = (filename or "").lower()
-        if m == "application/pdf" or fn.endswith(".pdf"):
-            return "pdf"
-        if m.startswith("image/"):
-            return "image"
-        if m.startswith("audio/"):
-            return "audio"
-        if m.startswith("video/"):
-            return "video"
-        return "file"
-
-    async def _create_file_artifact(filename: str, content_type: Optional[str], blob: bytes):
-        artifact = models.Artifact(
+    # Everything up to the file writes is staged on the session and goes out
+    # in create_file_artifacts' first commit (or the one below when there are
+    # no files), instead of a commit per park/building/note/job row.
+    try:
+        # --- validate uploads before writing anything ---
+        # Direct files are stored as-is; a zip is stored as one artifact and
+        # unpacked by the worker (ingest_zip job), so a large archive is
+        # written to disk once here and never decompressed on the request path.
+        sources = [
+            (f.filename, f.content_type, functools.partial(nullcontext, f.file))
+            for f in files or []
+            if f and f.filename and _file_size(f.file)
+        ]
+        job_types = ["extract_text"] * len(sources)
+
+        if zip_file and zip_file.filename:
+            if not zip_file.filename.lower().endswith(".zip"):
+                raise HTTPException(status_code=400, detail="zip_file must be a .zip")
+
+            # Basic size guard (tune as needed)
+            if _file_size(zip_file.file) > 200 * 1024 * 1024:
+                raise HTTPException(status_code=400, detail="zip too large (max 200MB)")
+
+            # Validate from the central directory only (no member is read)
+            try:
+                with zipfile.ZipFile(zip_file.file) as zf:
+                    zip_member_sources(zf)
+            except (zipfile.BadZipFile, ValueError) as e:
+                raise HTTPException(status_code=400, detail=str(e) or "invalid zip") from e
+            sources.append(
+                (zip_file.filename, "application/zip", functools.partial(nullcontext, zip_file.file))
+            )
+            job_types.append("ingest_zip")
+
+        # --- choose/create park ---
+        park: Optional[models.IndustrialPark] = None
+        new_park = False
+        if park_id:
+            park = db.get(models.IndustrialPark, int(park_id))
+            if not park:
+                raise HTTPException(status_code=404, detail="site not found")
+        else:
+            pn = (park_name or "").strip()
+            if not pn:
+                raise HTTPException(status_code=400, detail="provide park_id or park_name")
+            park = models.IndustrialPark(name=pn, location=(park_location or "").strip() or None)
+            db.add(park)
+            db.flush()
+            new_park = True
+
+        # --- create building ---
+        building = models.Building(
             industrial_park_id=park.id,
-            building_id=building.id,
-            kind=_guess_kind(content_type, filename),
-            mime_type=content_type,
-            original_filename=filename,
-            storage_path="PENDING",
-            status="uploaded",
+            name=building_name.strip(),
+            address=(building_address or "").strip() or None,
         )
-        db.add(artifact)
-        db.commit()
-        db.refresh(artifact)
-
-        path = build_artifact_path(artifact.id, filename)
-        path.write_bytes(blob)
-        artifact.storage_path = to_artifact_url(path)
-
-        db.add(artifact)
-        db.commit()
-        db.refresh(artifact)
-
-        enqueue_job(db, artifact.id, "extract_text")
-
-    # --- direct files ---
-    for f in files or []:
-        if not f or not f.filename:
-            continue
-        blob = await f.read()
-        await f.close()
-        if blob:
-            await _create_file_artifact(f.filename, f.content_type, blob)
-
-    # --- zip upload (optional) ---
-    if zip_file and zip_file.filename:
-        if not zip_file.filename.lower().endswith(".zip"):
-            raise HTTPException(status_code=400, detail="zip_file must be a .zip")
-
-        zip_blob = await zip_file.read()
-        await zip_file.close()
-
-        # Basic size guard (tune as needed)
-        if len(zip_blob) > 200 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="zip too large (max 200MB)")
-
-        with zipfile.ZipFile(io.BytesIO(zip_blob)) as zf:
-            members = _safe_zip_members(zf)
-
-            # Guard: max number of files
-            if len(members) > 300:
-                raise HTTPException(status_code=400, detail="zip contains too many files (max 300)")
-
-            for info in members:
-                name = info.filename.replace("\\", "/").lstrip("/")
-                # Skip hidden/system files
-                if name.split("/")[-1].startswith("."):
-                    continue
-                data = zf.read(info)
-                if not data:
-                    continue
-                # Content-type unknown from zip; guess by extension
-                guessed_mime, _ = mimetypes.guess_type(Path(name).name)
-                await _create_file_artifact(Path(name).name, guessed_mime, data)
-
-    return RedirectResponse(url=f"/review/buildings/{building.id}", status_code=HTTP_303_SEE_OTHER)
-
-def _make_snippet(text: str, q: str, radius: int = 90) -> str:
+        db.add(building)
+        db.flush()
+        park_pk, building_pk = park.id, building.id
+
+        # --- optional note as a text artifact ---
+        if note_text and note_text.strip():
+            a = models.Artifact(
+                industrial_park_id=park_pk,
+                building_id=building_pk,
+                kind="text",
+                mime_type="text/plain",
+                original_filename=None,
+                storage_path=None,
+                text_content=note_text,
+                status="uploaded",
+            )
+            db.add(a)
+            db.flush()
+            enqueue_jobs(db, [a.id], "extract_text", commit=False)
+
+        # --- file artifacts (file and DB work in a worker thread) ---
+        if sources:
+            await asyncio.to_thread(
+                create_file_artifacts, db, park_pk, building_pk, sources, job_types
+            )
+        else:
+            db.commit()
+        if new_park:
+            invalidate_park_options()
+    finally:
+        for f in files or []:
+            if f:
+                await f.close()
+        if zip_file:
+            await zip_file.close()
+
+    return RedirectResponse(url=f"/review/buildings/{building_pk}", status_code=HTTP_303_SEE_OTHER)
+
+def _file_size(f) -> int:
+    pos = f.tell()
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    f.seek(pos)
+    return size
+
+
+def _make_snippet(text: str, pat: Optional[re.Pattern], radius: int = 90) -> str:
     """
-    Returns a short HTML snippet with <mark>highlight</mark>.
-    Safe enough for MVP: we escape the original text then insert marks
-    by operating on lowercase match positions.
+    Returns a short HTML snippet with <mark>highlight</mark> around the
+    first match of `pat` (a compiled, case-insensitive pattern). Only the
+    snippet window is sliced and escaped, never the whole text.
     """
     if not text:
         return ""
-    q = (q or "").strip()
-    if not q:
-        return html.escape(text[: 2 * radius])
-
-    low = text.lower()
-    qlow = q.lower()
-    idx = low.find(qlow)
-    if idx < 0:
+    m = pat.search(text) if pat is not None else None
+    if m is None or m.end() == m.start():
         return html.escape(text[: 2 * radius])
 
-    start = max(0, idx - radius)
-    end = min(len(text), idx + len(q) + radius)
-    chunk = text[start:end]
+    start = max(0, m.start() - radius)
+    end = min(len(text), m.end() + radius)
 
-    # Escape first, then mark by locating in escaped text is hard;
-    # instead we do a simple safe approach: escape chunks and then
-    # replace escaped query occurrences case-insensitively using a scan.
-    escaped = html.escape(chunk)
-
-    # Best-effort marking: find in lowercased chunk (not escaped),
-    # then slice original chunk and escape pieces separately.
-    pre = html.escape(chunk[: idx - start])
-    mid = html.escape(chunk[idx - start : idx - start + len(q)])
-    post = html.escape(chunk[idx - start + len(q) :])
+    pre = html.escape(text[start : m.start()])
+    mid = html.escape(m.group())
+    post = html.escape(text[m.end() : end])
 
     prefix = "…" if start > 0 else ""
     suffix = "…" if end < len(text) else ""
     return f"{prefix}{pre}<mark>{mid}</mark>{post}{suffix}"
 
 
+# Artifact columns the search results render, fetched as plain rows
+_ARTIFACT_ROW_COLS = (
+    models.Artifact.id,
+    models.Artifact.kind,
+    models.Artifact.building_id,
+    models.Artifact.original_filename,
+    models.Artifact.storage_path,
+    models.Artifact.created_at,
+)
+
+
+def _contains_pattern(q: str) -> tuple[str, Optional[str]]:
+    """LIKE pattern matching `q` anywhere, plus the ESCAPE char it needs (if any)."""
+    if not any(ch in q for ch in "\\%_"):
+        return f"%{q}%", None
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%", "\\"
+
+
 # --- UI Search (fixed) ---
 @router.get("/ui/search")
 def ui_search(
     request: Request,
     q: str = "",
-    mode: str = "kw",       # kept for future (nl vs kw)
+    mode: str = "kw",       # "nl": word search over segment text (kw: substring)
     building_id: str = "",  # allow empty string
     park_id: str = "",      # allow empty string
     limit: int = 60,
@@ -542,8 +517,8 @@ def ui_search(
     q = (q or "").strip()
     limit = max(10, min(int(limit), 200))
 
-    bid = _clean_int(building_id)
-    pid = _clean_int(park_id)
+    bid = clean_int(building_id)
+    pid = clean_int(park_id)
 
     results = {
         "artifact_matches": [],   # artifacts matched by filename/metadata
@@ -564,98 +539,101 @@ def ui_search(
             },
         )
 
-    like = f"%{q}%"
+    # User-typed % and _ are matched literally. ESCAPE is only added when the
+    # query needs it: SQLite's FTS5 index can't serve LIKE ... ESCAPE.
+    like, esc = _contains_pattern(q)
 
     # ---- Base artifact scope (optional filters) ----
-    artifact_scope = db.query(models.Artifact)
-    if bid is not None:
-        artifact_scope = artifact_scope.filter(models.Artifact.building_id == bid)
-    if pid is not None:
-        artifact_scope = artifact_scope.filter(models.Artifact.industrial_park_id == pid)
-
-    scoped_ids = [row[0] for row in artifact_scope.with_entities(models.Artifact.id).all()]
-    # If no artifacts match filters, keep empty scope early
-    if (bid is not None or pid is not None) and not scoped_ids:
-        return templates.TemplateResponse(
-            "search.html",
-            {
-                "request": request,
-                "q": q,
-                "mode": mode,
-                "building_id": bid,
-                "park_id": pid,
-                "results": results,
-            },
-        )
+    # Kept as a subquery so each section below filters in SQL instead of
+    # shipping every scoped artifact id back as bind parameters.
+    scope = None
+    if bid is not None or pid is not None:
+        scope = select(models.Artifact.id)
+        if bid is not None:
+            scope = scope.where(models.Artifact.building_id == bid)
+        if pid is not None:
+            scope = scope.where(models.Artifact.industrial_park_id == pid)
 
     # ---- 1) Artifact metadata matches ----
-    aq = db.query(models.Artifact)
-    if scoped_ids:
-        aq = aq.filter(models.Artifact.id.in_(scoped_ids))
+    aq = db.query(*_ARTIFACT_ROW_COLS)
+    if scope is not None:
+        aq = aq.filter(models.Artifact.id.in_(scope))
     aq = aq.filter(
         or_(
-            models.Artifact.original_filename.ilike(like),
-            models.Artifact.kind.ilike(like),
-            models.Artifact.mime_type.ilike(like),
-            models.Artifact.text_content.ilike(like),
+            models.Artifact.original_filename.ilike(like, escape=esc),
+            models.Artifact.kind.ilike(like, escape=esc),
+            models.Artifact.mime_type.ilike(like, escape=esc),
+            models.Artifact.text_content.ilike(like, escape=esc),
         )
     ).order_by(models.Artifact.created_at.desc()).limit(25)
 
-    results["artifact_matches"] = list(aq.all())
+    results["artifact_matches"] = aq.all()
 
     # ---- 2) Claim matches (show top N by confidence) ----
-    cq = db.query(models.Claim)
-    if scoped_ids:
-        cq = cq.filter(models.Claim.artifact_id.in_(scoped_ids))
+    # Artifacts come back on the same SELECT (LEFT OUTER JOIN)
+    cq = db.query(
+        Bundle(
+            "claim",
+            models.Claim.artifact_id,
+            models.Claim.field_key,
+            models.Claim.value_json,
+            models.Claim.unit,
+            models.Claim.confidence,
+        ),
+        Bundle("artifact", *_ARTIFACT_ROW_COLS),
+    ).outerjoin(models.Artifact, models.Artifact.id == models.Claim.artifact_id)
+    if scope is not None:
+        cq = cq.filter(models.Claim.artifact_id.in_(scope))
     cq = cq.filter(
         or_(
-            models.Claim.field_key.ilike(like),
-            models.Claim.value_json.ilike(like),
-            models.Claim.unit.ilike(like),
+            models.Claim.field_key.ilike(like, escape=esc),
+            models.Claim.value_json.ilike(like, escape=esc),
+            models.Claim.unit.ilike(like, escape=esc),
         )
     ).order_by(models.Claim.confidence.desc()).limit(40)
 
-    claim_rows = list(cq.all())
-    # Map artifacts for display
-    claim_artifacts = {}
-    if claim_rows:
-        aids = sorted({c.artifact_id for c in claim_rows})
-        for a in db.query(models.Artifact).filter(models.Artifact.id.in_(aids)).all():
-            claim_artifacts[a.id] = a
-
     results["claim_matches"] = [
-        {"claim": c, "artifact": claim_artifacts.get(c.artifact_id)}
-        for c in claim_rows
+        {"claim": r.claim, "artifact": r.artifact if r.artifact.id is not None else None}
+        for r in cq.all()
     ]
 
     # ---- 3) Text segment matches (grouped by artifact, top N snippets each) ----
-    tq = db.query(models.ArtifactTextSegment)
-    if scoped_ids:
-        tq = tq.filter(models.ArtifactTextSegment.artifact_id.in_(scoped_ids))
-    tq = tq.filter(models.ArtifactTextSegment.text.ilike(like)).order_by(
-        models.ArtifactTextSegment.artifact_id.asc(),
-        models.ArtifactTextSegment.segment_index.asc(),
-    ).limit(limit)
-
-    segs = list(tq.all())
-
-    # Load referenced artifacts
-    seg_artifacts = {}
-    if segs:
-        aids = sorted({s.artifact_id for s in segs})
-        for a in db.query(models.Artifact).filter(models.Artifact.id.in_(aids)).all():
-            seg_artifacts[a.id] = a
-
-    grouped: dict[int, list[models.ArtifactTextSegment]] = defaultdict(list)
+    tq = db.query(
+        models.ArtifactTextSegment.artifact_id,
+        models.ArtifactTextSegment.segment_index,
+        models.ArtifactTextSegment.text,
+        Bundle("artifact", *_ARTIFACT_ROW_COLS),
+    ).join(models.Artifact, models.Artifact.id == models.ArtifactTextSegment.artifact_id)
+    if scope is not None:
+        tq = tq.filter(models.ArtifactTextSegment.artifact_id.in_(scope))
+    hits = segment_text_search(q) if mode == "nl" else None
+    # Compiled once for every snippet below; word search highlights any term
+    terms = q.split() if hits is not None else [q]
+    snippet_pat = re.compile("|".join(map(re.escape, terms)), re.IGNORECASE)
+    if hits is not None:
+        # Word match over the full-text index, best-ranked segments first
+        tq = tq.join(hits, hits.c.id == models.ArtifactTextSegment.id).order_by(
+            hits.c.rank.asc(),
+            models.ArtifactTextSegment.artifact_id.asc(),
+            models.ArtifactTextSegment.segment_index.asc(),
+        )
+    else:
+        tq = tq.filter(segment_text_ilike(like, escape=esc)).order_by(
+            models.ArtifactTextSegment.artifact_id.asc(),
+            models.ArtifactTextSegment.segment_index.asc(),
+        )
+    tq = tq.limit(limit)
+
+    segs = tq.all()
+
+    grouped: dict[int, list] = defaultdict(list)
     for s in segs:
         grouped[s.artifact_id].append(s)
 
     # Build groups with top 3 snippets per artifact
     text_groups = []
     for aid, seg_list in grouped.items():
-        a = seg_artifacts.get(aid)
-        if not a:
-            continue
+        a = seg_list[0].artifact
 
         # Keep first few segments for that artifact (already ordered by seg_index)
         top = seg_list[:3]
@@ -664,7 +642,7 @@ def ui_search(
             matches.append(
                 {
                     "segment_index": s.segment_index,  # used only for deep-link anchor
-                    "snippet_html": _make_snippet(s.text, q),
+                    "snippet_html": _make_snippet(s.text, snippet_pat),
                 }
             )
 
@@ -1,36 +1,24 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import or_
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
 from backend.app import models
 from backend.app.db import get_db
-from backend.app.services.jobs import enqueue_job
+from backend.app.routes._params import clean_int
+from backend.app.templating import templates
+from backend.app.services.jobs import enqueue_job, enqueue_jobs
+from backend.app.services.segment_search import segment_text_ilike
 
 from fastapi import Form
 
-templates = Jinja2Templates(directory="backend/app/templates")
 router = APIRouter()
 
 
-def _clean_int(s: str | None) -> Optional[int]:
-    if not s:
-        return None
-    s = s.strip()
-    if not s:
-        return None
-    try:
-        return int(s)
-    except Exception:
-        return None
-
-
 @router.get("/ui/artifacts")
 def artifact_gallery(
     request: Request,
@@ -47,8 +35,8 @@ def artifact_gallery(
     page_size = max(5, min(page_size, 100))
     offset = (page - 1) * page_size
 
-    pid = _clean_int(park_id)
-    bid = _clean_int(building_id)
+    pid = clean_int(park_id)
+    bid = clean_int(building_id)
 
     aq = db.query(models.Artifact)
 
@@ -65,15 +53,24 @@ def artifact_gallery(
     if q_stripped:
         qlike = f"%{q_stripped}%"
 
+        # Correlated EXISTS rather than IN (subquery): each artifact stops at
+        # its first matching claim/segment instead of the full match list
+        # being built up front.
         claim_match = (
-            db.query(models.Claim.artifact_id)
-            .filter(or_(models.Claim.field_key.ilike(qlike), models.Claim.value_json.ilike(qlike)))
-            .subquery()
+            select(models.Claim.id)
+            .where(
+                models.Claim.artifact_id == models.Artifact.id,
+                or_(models.Claim.field_key.ilike(qlike), models.Claim.value_json.ilike(qlike)),
+            )
+            .exists()
         )
         text_match = (
-            db.query(models.ArtifactTextSegment.artifact_id)
-            .filter(models.ArtifactTextSegment.text.ilike(qlike))
-            .subquery()
+            select(models.ArtifactTextSegment.id)
+            .where(
+                models.ArtifactTextSegment.artifact_id == models.Artifact.id,
+                segment_text_ilike(qlike),
+            )
+            .exists()
         )
 
         aq = aq.filter(
@@ -82,8 +79,8 @@ def artifact_gallery(
                 models.Artifact.kind.ilike(qlike),
                 models.Artifact.mime_type.ilike(qlike),
                 models.Artifact.text_content.ilike(qlike),
-                models.Artifact.id.in_(claim_match),
-                models.Artifact.id.in_(text_match),
+                claim_match,
+                text_match,
             )
         )
 
@@ -99,13 +96,16 @@ def artifact_gallery(
 
     page_count = (total + page_size - 1) // page_size
 
-    # claim count per artifact (cheap enough for MVP scale)
+    # claim count per artifact on this page, counted in SQL
     claim_counts: dict[int, int] = {}
     if artifacts:
         ids = [a.id for a in artifacts]
-        rows = db.query(models.Claim.artifact_id).filter(models.Claim.artifact_id.in_(ids)).all()
-        for (aid,) in rows:
-            claim_counts[aid] = claim_counts.get(aid, 0) + 1
+        claim_counts = dict(
+            db.query(models.Claim.artifact_id, func.count())
+            .filter(models.Claim.artifact_id.in_(ids))
+            .group_by(models.Claim.artifact_id)
+            .all()
+        )
 
     return templates.TemplateResponse(
         "artifact_gallery.html",
@@ -201,7 +201,8 @@ def ui_retry_failed_jobs(artifact_id: int, db: Session = Depends(get_db)):
     ]
 
     for jt in failed_types:
-        enqueue_job(db, artifact_id, jt)
+        enqueue_jobs(db, [artifact_id], jt, commit=False)
+    db.commit()
 
     return RedirectResponse(url=f"/ui/artifacts/{artifact_id}", status_code=303)
 
@@ -238,8 +239,8 @@ def ui_rerun_pipeline(artifact_id: int, db: Session = Depends(get_db)):
 
     # Order doesn't strictly matter if your worker just pulls queued jobs,
     # but it's nice to enqueue in a sane sequence.
-    enqueue_job(db, artifact_id, "extract_text")
-    enqueue_job(db, artifact_id, "extract_structured")
-    enqueue_job(db, artifact_id, "extract_discovery")
+    for jt in ("reextract_text", "extract_structured", "extract_discovery"):
+        enqueue_jobs(db, [artifact_id], jt, commit=False)
+    db.commit()
 
     return RedirectResponse(url=f"/ui/artifacts/{artifact_id}", status_code=303)
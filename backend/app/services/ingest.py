@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import mimetypes
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Callable, Optional, Sequence, Union
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.services.jobs import enqueue_jobs
+from backend.app.services.storage import build_artifact_path, to_artifact_url, write_stream
+
+MAX_ZIP_MEMBERS = 300
+
+# Threads writing files to disk in parallel within one upload
+INGEST_WRITE_WORKERS = 4
+
+# (filename, content_type, open_src) -- open_src() returns a readable binary
+# file object to use as a context manager
+FileSource = tuple[str, Optional[str], Callable]
+
+
+# Exact mime, then file extension, then the major mime type ("image/png" -> "image")
+_MIME_KIND = {
+    "application/pdf": "pdf",
+    "application/zip": "archive",
+    "application/x-zip-compressed": "archive",
+}
+_EXT_KIND = {".pdf": "pdf", ".zip": "archive"}
+_MIME_MAJOR_KIND = {"image": "image", "audio": "audio", "video": "video"}
+
+
+def guess_kind(mime: Optional[str], filename: str) -> str:
+    m = (mime or "").lower()
+    _, dot, ext = (filename or "").lower().rpartition(".")
+    major, slash, _ = m.partition("/")
+    return (
+        _MIME_KIND.get(m)
+        or (_EXT_KIND.get(dot + ext) if dot else None)
+        or (_MIME_MAJOR_KIND.get(major) if slash else None)
+        or "file"
+    )
+
+
+def safe_zip_members(zf: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    members: list[zipfile.ZipInfo] = []
+    for info in zf.infolist():
+        if info.is_dir():
+            continue
+        name = (info.filename or "").replace("\\", "/").lstrip("/")
+        # zip-slip protection
+        if ".." in name.split("/"):
+            continue
+        members.append(info)
+    return members
+
+
+def zip_member_sources(zf: zipfile.ZipFile) -> list[FileSource]:
+    """
+    One FileSource per member worth ingesting. Only reads the central
+    directory, so it is cheap enough to validate an upload with.
+    Raises ValueError past MAX_ZIP_MEMBERS.
+    """
+    members = safe_zip_members(zf)
+    if len(members) > MAX_ZIP_MEMBERS:
+        raise ValueError(f"zip contains too many files (max {MAX_ZIP_MEMBERS})")
+
+    sources: list[FileSource] = []
+    for info in members:
+        name = PurePosixPath(info.filename.replace("\\", "/").lstrip("/")).name
+        # Skip hidden/system files and empty entries
+        if name.startswith(".") or not info.file_size:
+            continue
+        # Content-type unknown from zip; guess by extension
+        guessed_mime, _ = mimetypes.guess_type(name)
+        sources.append((name, guessed_mime, functools.partial(zf.open, info)))
+    return sources
+
+
+def create_file_artifacts(
+    db: Session,
+    park_id: int,
+    building_id: int,
+    sources: list[FileSource],
+    job_type: Union[str, Sequence[str]] = "extract_text",
+) -> list[int]:
+    """
+    Store each source as a file artifact and queue `job_type` for it (one
+    job type for all sources, or one per source).
+
+    All rows go in with one INSERT and are committed before any bytes are
+    written, so no write transaction is held across disk I/O; anything the
+    caller has staged on the session rides along in that first commit.
+    Paths, sizes, hashes and jobs then land in one bulk UPDATE + INSERT and
+    a second commit. If any write or that commit fails, the new rows are
+    deleted and the files already written are removed before the error is
+    re-raised, so no artifact is left at storage_path="PENDING".
+    Blocking; async callers run it in a worker thread.
+    """
+    if not sources:
+        return []
+    artifact_ids = db.scalars(
+        insert(models.Artifact).returning(models.Artifact.id, sort_by_parameter_order=True),
+        [
+            {
+                "industrial_park_id": park_id,
+                "building_id": building_id,
+                "kind": guess_kind(content_type, filename),
+                "mime_type": content_type,
+                "original_filename": filename,
+                "storage_path": "PENDING",
+                "status": "uploaded",
+            }
+            for filename, content_type, _ in sources
+        ],
+    ).all()
+    db.commit()
+
+    written: list[Path] = []
+
+    def _store(artifact_id: int, source: FileSource) -> dict:
+        filename, _, open_src = source
+        path = build_artifact_path(artifact_id, filename)
+        written.append(path)
+        # Size and hash come from the same pass as the write, so the worker
+        # never re-reads the file to key its cache.
+        with open_src() as src:
+            size, sha = write_stream(src, path)
+        return {"id": artifact_id, "storage_path": to_artifact_url(path), "bytes_size": size, "sha256": sha}
+
+    try:
+        # Files are written concurrently: hashing, zlib inflate and file writes
+        # all release the GIL, and ZipFile serializes reads of its shared handle.
+        # No DB work happens on these threads.
+        if len(sources) == 1:
+            stored = [_store(artifact_ids[0], sources[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=INGEST_WRITE_WORKERS) as pool:
+                stored = list(pool.map(_store, artifact_ids, sources))
+        db.execute(update(models.Artifact), stored)
+
+        job_types = [job_type] * len(sources) if isinstance(job_type, str) else job_type
+        ids_by_job: dict[str, list[int]] = {}
+        for artifact_id, jt in zip(artifact_ids, job_types):
+            ids_by_job.setdefault(jt, []).append(artifact_id)
+        for jt, ids in ids_by_job.items():
+            enqueue_jobs(db, ids, jt, commit=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        db.execute(delete(models.Artifact).where(models.Artifact.id.in_(artifact_ids)))
+        db.commit()
+        for path in written:
+            path.unlink(missing_ok=True)
+            with contextlib.suppress(OSError):
+                path.parent.rmdir()  # the per-artifact a_<id> folder, if now empty
+        raise
+    return artifact_ids
@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from backend.app import models
 
@@ -13,3 +14,22 @@ def enqueue_job(db: Session, artifact_id: int, job_type: str) -> models.Processi
     db.commit()
     db.refresh(job)
     return job
+
+
+def enqueue_jobs(db: Session, artifact_ids: list[int], job_type: str, commit: bool = True) -> None:
+    """
+    Queue one job per artifact with a single INSERT (and commit, unless the
+    caller commits it together with other writes).
+    """
+    if not artifact_ids:
+        return
+    now = datetime.utcnow()
+    db.execute(
+        insert(models.ProcessingJob),
+        [
+            {"artifact_id": aid, "job_type": job_type, "status": "queued", "updated_at": now}
+            for aid in artifact_ids
+        ],
+    )
+    if commit:
+        db.commit()
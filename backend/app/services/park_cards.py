@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.services.ttl_cache import TTLCache
+
+# Building the review-home cards means counting every park's buildings and
+# artifacts, so the cards are reused while nothing new has been added. The
+# cache key is the highest park, building and artifact id, which costs three
+# primary-key lookups. Any capture or upload bumps it, whether it comes from
+# this process, the worker or a script. Deletes don't change the key, so
+# PARK_CARDS_TTL caps how long a deleted row can still be counted.
+PARK_CARDS_TTL = 60.0
+
+_cache = TTLCache(PARK_CARDS_TTL)
+
+
+def _fingerprint(db: Session) -> tuple:
+    p, b, a = models.IndustrialPark, models.Building, models.Artifact
+    return tuple(
+        db.execute(
+            select(
+                select(func.max(p.id)).scalar_subquery(),
+                select(func.max(b.id)).scalar_subquery(),
+                select(func.max(a.id)).scalar_subquery(),
+            )
+        ).one()
+    )
+
+
+def _compute_park_cards(db: Session) -> list[dict]:
+    p, b, a = models.IndustrialPark, models.Building, models.Artifact
+    # Cards hold column rows rather than ORM objects, which would detach
+    # when the session that loaded them closes
+    parks = db.query(p.id, p.name, p.location).order_by(p.id.desc()).all()
+
+    # Per-park counts in two grouped queries instead of 2 queries per park
+    building_counts = dict(
+        db.query(b.industrial_park_id, func.count(b.id)).group_by(b.industrial_park_id).all()
+    )
+    # A park's artifacts are those attached to the park plus those attached to
+    # one of its buildings; UNION (not UNION ALL) counts an artifact with both once
+    pairs = union(
+        select(a.industrial_park_id.label("park_id"), a.id, a.created_at),
+        select(b.industrial_park_id, a.id, a.created_at).join(b, b.id == a.building_id),
+    ).subquery()
+    activity = {
+        pid: (n, last)
+        for pid, n, last in db.execute(
+            select(pairs.c.park_id, func.count(), func.max(pairs.c.created_at)).group_by(pairs.c.park_id)
+        )
+    }
+
+    return [
+        {
+            "park": park,
+            "building_count": building_counts.get(park.id, 0),
+            "artifact_count": activity.get(park.id, (0, None))[0],
+            "last_activity_at": activity.get(park.id, (0, None))[1],
+        }
+        for park in parks
+    ]
+
+
+def park_cards(db: Session) -> list[dict]:
+    return _cache.get(lambda: _compute_park_cards(db), key=_fingerprint(db))
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.services.ttl_cache import TTLCache
+
+# Every page with a park picker renders this list, and parks are rarely added,
+# so the dropdown rows (id, name, location, newest first) are reused for
+# PARK_OPTIONS_TTL seconds. Park creation in this process calls
+# invalidate_park_options(); parks made by the worker or seed scripts appear
+# once the TTL runs out.
+PARK_OPTIONS_TTL = 30.0
+
+_cache = TTLCache(PARK_OPTIONS_TTL)
+
+
+def _load_park_options(db: Session) -> list:
+    p = models.IndustrialPark
+    # Column rows, not ORM instances: they stay valid after this session closes
+    return db.query(p.id, p.name, p.location).order_by(p.id.desc()).all()
+
+
+def park_options(db: Session) -> list:
+    return _cache.get(lambda: _load_park_options(db))
+
+
+def invalidate_park_options() -> None:
+    _cache.invalidate()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import datetime as dt
+import functools
 import hashlib
 
 from sqlalchemy.orm import Session
@@ -10,6 +11,9 @@ from backend.app.services.scoring import ScoreResult, score_building
 
 SCORING_VERSION = "v1"
 
+# Decoded cache payloads kept in-process across requests
+SCORE_PAYLOAD_CACHE_SIZE = 4096
+
 
 def _input_hash(texts: list[str | None]) -> str:
     cleaned = [" ".join((t or "").split()) for t in texts if t and t.strip()]
@@ -17,49 +21,84 @@ def _input_hash(texts: list[str | None]) -> str:
     return hashlib.sha256(payload).hexdigest()
 
 
+@functools.lru_cache(maxsize=SCORE_PAYLOAD_CACHE_SIZE)
+def _load_payload(payload_json: str) -> ScoreResult:
+    # Keyed on the stored payload itself, so a rescored building (new payload)
+    # simply misses; callers treat the shared result as read-only.
+    return ScoreResult.model_validate_json(payload_json)
+
+
 def get_or_compute_building_score(db: Session, building_id: int) -> ScoreResult:
-    # Pull text artifacts (notes) for this building
+    return get_or_compute_building_scores(db, [building_id])[building_id]
+
+
+def get_or_compute_building_scores(
+    db: Session, building_ids: list[int]
+) -> dict[int, ScoreResult]:
+    """
+    Batch version of get_or_compute_building_score: one query for note texts,
+    one for cache rows, and a single commit for any refreshed entries.
+    """
+    ids = sorted(set(building_ids))
+    if not ids:
+        return {}
+
+    # Pull text artifacts (notes) for these buildings
     rows = (
-        db.query(models.Artifact.text_content)
+        db.query(models.Artifact.building_id, models.Artifact.text_content)
         .filter(
-            models.Artifact.building_id == building_id,
+            models.Artifact.building_id.in_(ids),
             models.Artifact.kind == "text",
         )
+        .order_by(models.Artifact.id.asc())
         .all()
     )
-    texts = [r[0] for r in rows]
-    h = _input_hash(texts)
+    texts_by_building: dict[int, list[str | None]] = {bid: [] for bid in ids}
+    for bid, text in rows:
+        texts_by_building[bid].append(text)
 
-    cached = (
-        db.query(models.BuildingScoreCache)
-        .filter(
-            models.BuildingScoreCache.building_id == building_id,
+    cached_by_building = {
+        c.building_id: c
+        for c in db.query(models.BuildingScoreCache).filter(
+            models.BuildingScoreCache.building_id.in_(ids),
             models.BuildingScoreCache.version == SCORING_VERSION,
         )
-        .first()
-    )
+    }
 
-    # Cache hit if hash matches
-    if cached and cached.input_hash == h:
-        return ScoreResult.model_validate_json(cached.payload_json)
-
-    # Cache miss → compute fresh
-    result = score_building(texts)
-    payload_json = result.model_dump_json()
-
-    if cached is None:
-        cached = models.BuildingScoreCache(
-            building_id=building_id,
-            version=SCORING_VERSION,
-            input_hash=h,
-            payload_json=payload_json,
-            updated_at=dt.datetime.utcnow(),
-        )
-        db.add(cached)
-    else:
-        cached.input_hash = h
-        cached.payload_json = payload_json
-        cached.updated_at = dt.datetime.utcnow()
-
-    db.commit()
-    return result
+    results: dict[int, ScoreResult] = {}
+    dirty = False
+    for bid in ids:
+        texts = texts_by_building[bid]
+        h = _input_hash(texts)
+        cached = cached_by_building.get(bid)
+
+        # Cache hit if hash matches
+        if cached and cached.input_hash == h:
+            results[bid] = _load_payload(cached.payload_json)
+            continue
+
+        # Cache miss → compute fresh
+        result = score_building(texts)
+        payload_json = result.model_dump_json()
+
+        if cached is None:
+            db.add(
+                models.BuildingScoreCache(
+                    building_id=bid,
+                    version=SCORING_VERSION,
+                    input_hash=h,
+                    payload_json=payload_json,
+                    updated_at=dt.datetime.utcnow(),
+                )
+            )
+        else:
+            cached.input_hash = h
+            cached.payload_json = payload_json
+            cached.updated_at = dt.datetime.utcnow()
+
+        results[bid] = result
+        dirty = True
+
+    if dirty:
+        db.commit()
+    return results
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+from sqlalchemy import column, func, literal_column, select, table
+
+from backend.app import models
+from backend.app.db import DB_URL, SEGMENT_FTS_TABLE, SEGMENT_TSV_CONFIG, segment_fts_available
+
+_fts = table(SEGMENT_FTS_TABLE, column("rowid"), column("text"))
+
+_TERM_RE = re.compile(r"\w+")
+
+
+def segment_text_ilike(pattern: str, escape: Optional[str] = None):
+    """
+    WHERE clause for ArtifactTextSegment.text ILIKE `pattern`.
+
+    Uses the trigram FTS index when the DB has one (LIKE on the FTS table is
+    answered from the index, case-insensitively); otherwise a plain ILIKE.
+    """
+    seg = models.ArtifactTextSegment
+    if not segment_fts_available():
+        return seg.text.ilike(pattern, escape=escape)
+    return seg.id.in_(select(_fts.c.rowid).where(_fts.c.text.like(pattern, escape=escape)))
+
+
+def segment_text_search(q: str):
+    """
+    Word search over segment text for multi-word (NL) queries.
+
+    Returns a subquery of (id, rank) for the matching segments -- lower rank
+    is a better match -- or None when this DB has no full-text index, in
+    which case callers fall back to segment_text_ilike().
+    """
+    seg = models.ArtifactTextSegment
+    if DB_URL.startswith("postgresql"):
+        tsv = func.to_tsvector(literal_column(f"'{SEGMENT_TSV_CONFIG}'"), seg.text)
+        query = func.plainto_tsquery(literal_column(f"'{SEGMENT_TSV_CONFIG}'"), q)
+        return (
+            select(seg.id.label("id"), (-func.ts_rank_cd(tsv, query)).label("rank"))
+            .where(tsv.op("@@")(query))
+            .subquery()
+        )
+
+    if not segment_fts_available():
+        return None
+    # The trigram tokenizer can only match terms of 3+ characters; every term
+    # must appear (as a substring), ranked by bm25.
+    terms = [t for t in _TERM_RE.findall(q.lower()) if len(t) >= 3]
+    if not terms:
+        return None
+    expr = " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+    fts = literal_column(SEGMENT_FTS_TABLE)
+    return (
+        select(_fts.c.rowid.label("id"), func.bm25(fts).label("rank"))
+        .where(fts.op("MATCH")(expr))
+        .subquery()
+    )
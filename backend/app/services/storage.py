@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
 import re
 from contextlib import contextmanager
@@ -53,6 +55,76 @@ def build_artifact_path(artifact_id: int, original_filename: str) -> Path:
     return folder / f"{unique}__{safe}"
 
 
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+def sha256_file(path: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """
+    Hash a file on disk without loading it into memory, in 1 MiB reads.
+    (hashlib.file_digest would do the same, but only exists on 3.11+.)
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+async def save_upload_file(upload, path: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> tuple[int, str]:
+    """
+    Stream an UploadFile to `path` in fixed-size chunks, hashing as we go.
+    The whole copy runs in one worker thread, so the event loop keeps
+    serving other requests. Returns (bytes_written, sha256_hex).
+    """
+    return await save_stream(upload.file, path, chunk_size)
+
+
+async def save_stream(src, path: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> tuple[int, str]:
+    """
+    save_upload_file for any readable binary file object (e.g. a zip member
+    from ZipFile.open()). Returns (bytes_written, sha256_hex).
+    """
+    return await asyncio.to_thread(write_stream, src, path, chunk_size)
+
+
+def write_stream(src, path: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> tuple[int, str]:
+    """Blocking body of save_stream, for code already off the event loop."""
+    # OpenSSL-backed (SHA-NI where available), and update() releases the GIL
+    # for large buffers, so concurrent uploads hash in parallel. Hashing while
+    # streaming avoids re-reading the file with sha256_file() afterwards.
+    #
+    # readinto() refills one reusable buffer (no new bytes object per chunk);
+    # sources without it (SpooledTemporaryFile before 3.11) fall back to
+    # read(). The target is unbuffered FileIO: chunks are already large, so a
+    # BufferedWriter would only memcpy each one into its own buffer first.
+    # The page cache is left alone on purpose; the worker reads the file
+    # back soon after upload.
+    h = hashlib.sha256()
+    total = 0
+    # Rewind sources that were already read (e.g. by form parsing). Not via
+    # seekable(): SpooledTemporaryFile only has it from Python 3.11.
+    try:
+        src.seek(0)
+    except (AttributeError, OSError):
+        pass  # unseekable stream: copy from wherever it is
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    readinto = getattr(src, "readinto", None)
+
+    def next_chunk() -> memoryview:
+        if readinto is not None:
+            return view[: readinto(buf) or 0]
+        return memoryview(src.read(chunk_size))
+
+    with open(path, "wb", buffering=0) as out:
+        while n := len(chunk := next_chunk()):
+            h.update(chunk)
+            while chunk:  # raw writes may be partial
+                chunk = chunk[out.write(chunk):]
+            total += n
+    return total, h.hexdigest()
+
+
 def _served_to_disk_path(p: str) -> Path:
     p = (p or "").strip()
 
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+from typing import Iterable
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.db import upsert_insert
+from backend.app.services.storage import get_artifact_path, sha256_file
+
+
+def cache_key(extractor: str, version: int, **config) -> str:
+    """
+    Cache key for `extractor` at code `version` with the settings that shape
+    its output, e.g. "pdf:v2:1f3a9c0b7d2e4a65". Changing either one makes
+    earlier entries miss instead of serving text from the old extractor.
+    """
+    digest = hashlib.sha256(repr(sorted(config.items())).encode("utf-8")).hexdigest()[:16]
+    return f"{extractor}:v{version}:{digest}"
+
+
+def artifact_sha256(artifact: models.Artifact) -> str:
+    """The upload-time hash if we have one, otherwise hash the file on disk."""
+    return artifact.sha256 or sha256_file(get_artifact_path(artifact))
+
+
+def restore_segments(db: Session, artifact_id: int, file_sha256: str, extractor: str) -> bool:
+    """
+    Replace the artifact's segments with the cached ones for this file.
+    Returns False on a cache miss. Does NOT commit.
+    """
+    cached = db.get(models.ExtractedTextCache, (file_sha256, extractor))
+    if cached is None:
+        return False
+
+    db.query(models.ArtifactTextSegment).filter(
+        models.ArtifactTextSegment.artifact_id == artifact_id
+    ).delete(synchronize_session=False)
+
+    # segment_index is restored as written (PDF page index, used as the
+    # search deep-link anchor), so the rows match the original extraction
+    # exactly. Entries cached before it was stored are [source_ref, text].
+    rows = []
+    for pos, entry in enumerate(json.loads(cached.segments_json)):
+        idx, source_ref, text = entry if len(entry) == 3 else (pos, *entry)
+        rows.append(
+            {
+                "artifact_id": artifact_id,
+                "segment_index": idx,
+                "text": text,
+                "source_ref": source_ref,
+            }
+        )
+    if rows:
+        db.execute(insert(models.ArtifactTextSegment), rows)
+    return True
+
+
+def store_segments(db: Session, artifact_id: int, file_sha256: str, extractor: str) -> None:
+    """
+    Snapshot the artifact's current segments into the cache and commit.
+    """
+    segs = db.execute(
+        select(
+            models.ArtifactTextSegment.segment_index,
+            models.ArtifactTextSegment.source_ref,
+            models.ArtifactTextSegment.text,
+        )
+        .where(models.ArtifactTextSegment.artifact_id == artifact_id)
+        .order_by(models.ArtifactTextSegment.segment_index.asc())
+    ).all()
+    if not segs:
+        return
+
+    payload = json.dumps([list(row) for row in segs], separators=(",", ":"), ensure_ascii=False)
+    stmt = upsert_insert(db, models.ExtractedTextCache).values(
+        file_sha256=file_sha256,
+        extractor=extractor,
+        segments_json=payload,
+        updated_at=dt.datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["file_sha256", "extractor"],
+        set_={"segments_json": stmt.excluded.segments_json, "updated_at": stmt.excluded.updated_at},
+    )
+    db.execute(stmt)
+    db.commit()
+
+
+def segments_sha256(rows: Iterable[tuple[int, str | None, str]]) -> str:
+    """Fingerprint of (segment_index, source_ref, text) rows, in order."""
+    h = hashlib.sha256()
+    for idx, ref, text in rows:
+        h.update(f"{idx}\x1f{ref or ''}\x1f".encode("utf-8"))
+        h.update((text or "").encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def commit_segments(db: Session, artifact: models.Artifact) -> bool:
+    """
+    Commit freshly written segments, unless they are identical to what the
+    last extraction wrote; then roll back so nothing is rewritten.
+    Returns True if the segments changed.
+    """
+    rows = db.execute(
+        select(
+            models.ArtifactTextSegment.segment_index,
+            models.ArtifactTextSegment.source_ref,
+            models.ArtifactTextSegment.text,
+        )
+        .where(models.ArtifactTextSegment.artifact_id == artifact.id)
+        .order_by(models.ArtifactTextSegment.segment_index.asc())
+        .execution_options(yield_per=256)
+    )
+    digest = segments_sha256(rows)
+    if digest == artifact.last_extracted_sha256:
+        db.rollback()
+        return False
+
+    artifact.last_extracted_sha256 = digest
+    db.commit()
+    return True
+
+
+def commit_and_store_segments(
+    db: Session, artifact: models.Artifact, file_sha256: str, extractor: str
+) -> bool:
+    """
+    commit_segments(), then snapshot the result into the cache when it
+    changed or the cache has no entry yet (e.g. a crash between the two
+    commits, or a new cache key). Returns True if the segments changed.
+    """
+    changed = commit_segments(db, artifact)
+    if changed or db.get(models.ExtractedTextCache, (file_sha256, extractor)) is None:
+        store_segments(db, artifact.id, file_sha256, extractor)
+    return changed
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    A single cached value shared by every request in the process.
+
+    The value is recomputed once it is older than `ttl` seconds, when the
+    caller passes a different `key`, or after invalidate(). compute() runs
+    outside the lock, so a slow query never blocks other readers; two
+    concurrent misses may both compute, and the later result wins.
+    Cached values are shared across requests and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entry: Optional[tuple[float, Hashable, Any]] = None
+
+    def get(self, compute: Callable[[], Any], key: Hashable = None) -> Any:
+        with self._lock:
+            entry = self._entry
+            if entry is not None and entry[1] == key and time.monotonic() - entry[0] < self.ttl:
+                return entry[2]
+        value = compute()
+        with self._lock:
+            self._entry = (time.monotonic(), key, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entry = None
@@ -0,0 +1,48 @@
+# backend/app/templating.py
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from jinja2.bccache import Bucket
+
+# ------------------------------------------------------------
+# Shared Jinja2 templates
+# ------------------------------------------------------------
+
+TEMPLATES_DIR = "backend/app/templates"
+
+# Compiled template bytecode is cached on disk so a fresh process (worker
+# restart, uvicorn --reload) skips lexing/parsing/compiling every template.
+# POWERTOWN_JINJA_CACHE_DIR moves the cache (relative paths are taken from
+# the working directory); set it to an empty string to disable the cache.
+JINJA_CACHE_DIR = os.getenv("POWERTOWN_JINJA_CACHE_DIR", "data/jinja-cache")
+
+
+class _LazyBytecodeCache(FileSystemBytecodeCache):
+    """Creates the cache directory on the first write, not at import time."""
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        try:
+            Path(self.directory).mkdir(parents=True, exist_ok=True)
+        except OSError:
+            return  # unwritable location: render without caching
+        super().dump_bytecode(bucket)
+
+
+# With auto_reload off, a loaded template is never re-stat'ed; edits to .html
+# files then need a restart. On by default since `uvicorn --reload` only
+# restarts on .py changes; set POWERTOWN_TEMPLATE_RELOAD=0 in production.
+TEMPLATES_AUTO_RELOAD = os.getenv("POWERTOWN_TEMPLATE_RELOAD", "1") == "1"
+
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=TEMPLATES_AUTO_RELOAD,
+        bytecode_cache=_LazyBytecodeCache(JINJA_CACHE_DIR) if JINJA_CACHE_DIR else None,
+    )
+)
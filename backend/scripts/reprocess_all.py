@@ -1,15 +1,16 @@
 from backend.app.db import SessionLocal, init_db
 from backend.app import models
-from backend.app.services.jobs import enqueue_job
+from backend.app.services.jobs import enqueue_jobs
 
 def main():
     init_db()
     db = SessionLocal()
     try:
-        arts = db.query(models.Artifact).all()
-        for a in arts:
-            enqueue_job(db, a.id, "extract_text")
-        print(f"enqueued {len(arts)} artifacts")
+        # ids only, queued with one INSERT and one commit
+        ids = [aid for (aid,) in db.query(models.Artifact.id)]
+        # reextract_text: ignore the text cache, extract every file afresh
+        enqueue_jobs(db, ids, "reextract_text")
+        print(f"enqueued {len(ids)} artifacts")
     finally:
         db.close()
 
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import argparse
-import hashlib
 import mimetypes
+import shutil
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Sequence
 
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from backend.app import models
 from backend.app.db import SessionLocal, init_db
-from backend.app.services.storage import artifacts_root, build_artifact_path, to_artifact_url
+from backend.app.services.storage import (
+    artifacts_root,
+    build_artifact_path,
+    sha256_file,
+    to_artifact_url,
+)
 
 # If you want the seed to automatically enqueue processing jobs
 try:
@@ -40,10 +46,6 @@ SHOWROOM_AUDIO_DIR = DEMO_DATA_DIR / "showroom_audio"
 # --------------------------
 # Helpers
 # --------------------------
-def _sha256(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
-
-
 def _artifact_folder_for_id(artifact_id: int) -> Path:
     return artifacts_root() / f"a_{artifact_id}"
 
@@ -131,6 +133,7 @@ def _reset_demo_data(db: Session) -> None:
       - processing_jobs
       - artifact_text_segments
       - claims
+      - building_score_cache / building_scores
     """
     park = (
         db.query(models.IndustrialPark)
@@ -140,27 +143,26 @@ def _reset_demo_data(db: Session) -> None:
     if not park:
         return
 
-    buildings = (
-        db.query(models.Building)
-        .filter(models.Building.industrial_park_id == park.id)
-        .all()
-    )
-    building_ids = [b.id for b in buildings]
+    # Only ids are needed: one id query for buildings, one for artifacts
+    # (park-level or attached to any of the park's buildings).
+    building_ids = [
+        bid
+        for (bid,) in db.query(models.Building.id).filter(
+            models.Building.industrial_park_id == park.id
+        )
+    ]
 
-    artifacts: list[models.Artifact] = []
-    artifacts.extend(
-        db.query(models.Artifact)
-        .filter(models.Artifact.industrial_park_id == park.id)
-        .all()
-    )
+    artifact_filter = models.Artifact.industrial_park_id == park.id
     if building_ids:
-        artifacts.extend(
-            db.query(models.Artifact)
-            .filter(models.Artifact.building_id.in_(building_ids))
-            .all()
+        artifact_filter = or_(
+            artifact_filter, models.Artifact.building_id.in_(building_ids)
         )
-
-    artifact_ids = sorted({a.id for a in artifacts})
+    artifact_ids = [
+        aid
+        for (aid,) in db.query(models.Artifact.id)
+        .filter(artifact_filter)
+        .order_by(models.Artifact.id.asc())
+    ]
 
     if artifact_ids:
         db.query(models.ProcessingJob).filter(
@@ -182,6 +184,14 @@ def _reset_demo_data(db: Session) -> None:
         db.commit()
 
     if building_ids:
+        db.query(models.BuildingScoreCache).filter(
+            models.BuildingScoreCache.building_id.in_(building_ids)
+        ).delete(synchronize_session=False)
+
+        db.query(models.BuildingScore).filter(
+            models.BuildingScore.building_id.in_(building_ids)
+        ).delete(synchronize_session=False)
+
         db.query(models.Building).filter(models.Building.id.in_(building_ids)).delete(
             synchronize_session=False
         )
@@ -252,13 +262,12 @@ def _create_file_artifact_from_path(
     db.commit()
     db.refresh(a)
 
-    data = src_path.read_bytes()
     disk_path = build_artifact_path(a.id, filename)
-    disk_path.write_bytes(data)
+    shutil.copyfile(src_path, disk_path)
 
     a.storage_path = to_artifact_url(disk_path)
-    a.bytes_size = len(data)
-    a.sha256 = _sha256(data)
+    a.bytes_size = disk_path.stat().st_size
+    a.sha256 = sha256_file(disk_path)
 
     db.commit()
     db.refresh(a)
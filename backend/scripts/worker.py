@@ -10,19 +10,25 @@ Key fix:
 from __future__ import annotations
 
 import argparse
+import logging
+import multiprocessing
 import os
 import signal
 import sys
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from sqlalchemy import and_
+from sqlalchemy.orm import joinedload
 
 
 POLL_SECONDS_DEFAULT = 1.0
 MAX_ATTEMPTS_DEFAULT = 3
 RECLAIM_AFTER_SECONDS_DEFAULT = 15 * 60  # 15 minutes
+TRUNCATE_CHECKPOINT_EVERY = 50  # jobs between WAL TRUNCATE checkpoints
 
 
 def _utcnow() -> datetime:
@@ -62,6 +68,17 @@ def _parse_args() -> argparse.Namespace:
         default=int(os.getenv("WORKER_MAX_ATTEMPTS", str(MAX_ATTEMPTS_DEFAULT))),
         help="Max attempts per job before marking failed",
     )
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("WORKER_CONCURRENCY", "1")),
+        help="Jobs to run in parallel (separate processes). 1 = run jobs inline",
+    )
+    p.add_argument(
+        "--log-level",
+        default=os.getenv("WORKER_LOG_LEVEL", "WARNING"),
+        help="Level for processor logs (DEBUG shows per-artifact traces)",
+    )
     p.add_argument(
         "--reclaim-after-seconds",
         type=int,
@@ -101,21 +118,31 @@ def _apply_env(args: argparse.Namespace) -> None:
     if args.structured_extractor:
         os.environ["STRUCTURED_EXTRACTOR"] = str(args.structured_extractor)
 
+    # Inherited by spawned pool children
+    os.environ["WORKER_LOG_LEVEL"] = str(args.log_level).upper()
+
+
+def _configure_logging() -> None:
+    logging.basicConfig(
+        level=os.getenv("WORKER_LOG_LEVEL", "WARNING").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
 
-def _reclaim_stuck_jobs(db, models, reclaim_after_seconds: int) -> int:
+def _reclaim_stuck_jobs(db, models, reclaim_after_seconds: int, running_ids=()) -> int:
     cutoff = _utcnow() - timedelta(seconds=reclaim_after_seconds)
 
-    stuck = (
-        db.query(models.ProcessingJob)
-        .filter(
-            and_(
-                models.ProcessingJob.status == "processing",
-                models.ProcessingJob.updated_at != None,  # noqa: E711
-                models.ProcessingJob.updated_at < cutoff,
-            )
+    q = db.query(models.ProcessingJob).filter(
+        and_(
+            models.ProcessingJob.status == "processing",
+            models.ProcessingJob.updated_at != None,  # noqa: E711
+            models.ProcessingJob.updated_at < cutoff,
         )
-        .all()
     )
+    # Jobs still running in our own process pool are slow, not stuck
+    if running_ids:
+        q = q.filter(models.ProcessingJob.id.notin_(list(running_ids)))
+    stuck = q.all()
 
     n = 0
     for job in stuck:
@@ -129,18 +156,18 @@ def _reclaim_stuck_jobs(db, models, reclaim_after_seconds: int) -> int:
     return n
 
 
-def _claim_one_job(db, models, max_attempts: int):
-    job = (
-        db.query(models.ProcessingJob)
-        .filter(
-            and_(
-                models.ProcessingJob.status == "queued",
-                models.ProcessingJob.attempts < max_attempts,
-            )
+def _claim_one_job(db, models, max_attempts: int, busy_artifact_ids=()):
+    q = db.query(models.ProcessingJob).filter(
+        and_(
+            models.ProcessingJob.status == "queued",
+            models.ProcessingJob.attempts < max_attempts,
         )
-        .order_by(models.ProcessingJob.created_at.asc())
-        .first()
     )
+    # Jobs for one artifact must run in order (extract_text before
+    # extract_structured, ...), so skip artifacts that already have one running.
+    if busy_artifact_ids:
+        q = q.filter(models.ProcessingJob.artifact_id.notin_(list(busy_artifact_ids)))
+    job = q.order_by(models.ProcessingJob.created_at.asc()).first()
     if not job:
         return None
 
@@ -148,19 +175,98 @@ def _claim_one_job(db, models, max_attempts: int):
     job.started_at = _utcnow()
     job.updated_at = _utcnow()
     job.attempts += 1
+    job_id = job.id
+    db.commit()
+    # Reload the job and its artifact in one SELECT; run_job's
+    # db.get(Artifact, ...) is then served from the identity map.
+    return _load_job(db, models, job_id)
+
+
+def _load_job(db, models, job_id: int):
+    return db.get(
+        models.ProcessingJob,
+        job_id,
+        options=[joinedload(models.ProcessingJob.artifact)],
+        populate_existing=True,
+    )
+
+
+def _execute_job(db, job, run_job, max_attempts: int) -> bool:
+    """
+    Run one claimed job and record the outcome. Returns True on success.
+    """
+    try:
+        run_job(db, job)
+
+        job.status = "done"
+        job.finished_at = _utcnow()
+        job.updated_at = _utcnow()
+        job.last_error = None
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        job.last_error = str(e)[:2000]
+        job.updated_at = _utcnow()
+        job.status = "failed" if job.attempts >= max_attempts else "queued"
+        db.commit()
+        return False
+
+
+def _run_job_in_child(job_id: int, max_attempts: int) -> bool:
+    """
+    Process-pool entrypoint. Each child (spawned, not forked) imports its own
+    engine/session, Whisper model and LLM handle from the inherited env.
+    """
+    from backend.app import models
+    from backend.app.db import SessionLocal
+    from backend.app.processors.registry import run_job
+
+    db = SessionLocal()
+    try:
+        job = _load_job(db, models, job_id)
+        if job is None:
+            return False
+        return _execute_job(db, job, run_job, max_attempts)
+    finally:
+        db.close()
+
+
+def _init_child() -> None:
+    # The parent handles Ctrl-C / SIGTERM and lets in-flight jobs finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _configure_logging()
+
+    # Pay the heavy imports (SQLAlchemy models, fitz, processors) while the
+    # pool starts up rather than inside the first job each child picks up.
+    import backend.app.processors.registry  # noqa: F401
+
+
+def _new_executor(concurrency: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=concurrency,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_child,
+    )
+
+
+def _requeue_unstarted(db, job) -> None:
+    # Claimed but never handed to a child: give the attempt back
+    job.status = "queued"
+    job.attempts = max(0, job.attempts - 1)
+    job.updated_at = _utcnow()
     db.commit()
-    db.refresh(job)
-    return job
 
 
 def main() -> None:
     _load_dotenv_early()
     args = _parse_args()
     _apply_env(args)
+    _configure_logging()
 
     # ✅ CRITICAL: import db + models ONLY AFTER env is applied
     from backend.app import models  # noqa: E402
-    from backend.app.db import SessionLocal, init_db  # noqa: E402
+    from backend.app.db import SessionLocal, checkpoint, init_db  # noqa: E402
 
     # ✅ import processors AFTER env is applied (structured extractor reads env)
     from backend.app.processors.registry import run_job  # noqa: E402
@@ -182,37 +288,107 @@ def main() -> None:
         print(f"  LLAMA_GGUF_PATH={os.getenv('LLAMA_GGUF_PATH')}")
 
     last_reclaim = 0.0
+    jobs_done = 0
+
+    def _after_success(db) -> None:
+        nonlocal jobs_done
+        # Keep the -wal file bounded while the worker is busy
+        jobs_done += 1
+        mode = "TRUNCATE" if jobs_done % TRUNCATE_CHECKPOINT_EVERY == 0 else "PASSIVE"
+        checkpoint(db, mode)
+
+    concurrency = max(1, args.concurrency)
+    executor: Optional[ProcessPoolExecutor] = None
+    if concurrency > 1:
+        # Each child runs its own PDF OCR pool; split the cores between them
+        # instead of starting concurrency x cpu_count tesseract processes.
+        os.environ.setdefault(
+            "PDF_OCR_WORKERS", str(max(1, (os.cpu_count() or 1) // concurrency))
+        )
+        print(f"  concurrency={concurrency} (process pool)")
+        executor = _new_executor(concurrency)
+    # future -> (job_id, artifact_id)
+    in_flight: dict[Future, tuple[int, int]] = {}
+
+    def _settle(db, fut: Future) -> bool:
+        """Record a finished pool job. Returns True if the pool itself broke."""
+        job_id, _ = in_flight.pop(fut)
+        try:
+            ok = fut.result()
+        except Exception as e:
+            # Child crashed before it could record the outcome
+            job = db.get(models.ProcessingJob, job_id)
+            if job is not None:
+                job.last_error = str(e)[:2000]
+                job.updated_at = _utcnow()
+                job.status = "failed" if job.attempts >= args.max_attempts else "queued"
+                db.commit()
+            return isinstance(e, BrokenProcessPool)
+        if ok:
+            _after_success(db)
+        return False
+
     while not stop:
         db = SessionLocal()
         try:
             now = time.time()
             if now - last_reclaim > 30:
-                reclaimed = _reclaim_stuck_jobs(db, models, args.reclaim_after_seconds)
+                running_ids = {jid for jid, _ in in_flight.values()}
+                reclaimed = _reclaim_stuck_jobs(db, models, args.reclaim_after_seconds, running_ids)
                 if reclaimed:
                     print(f"reclaimed {reclaimed} stuck job(s)")
                 last_reclaim = now
 
-            job = _claim_one_job(db, models, args.max_attempts)
-            if not job:
-                time.sleep(args.poll_seconds)
+            if executor is None:
+                job = _claim_one_job(db, models, args.max_attempts)
+                if not job:
+                    time.sleep(args.poll_seconds)
+                    continue
+
+                if _execute_job(db, job, run_job, args.max_attempts):
+                    _after_success(db)
                 continue
 
-            try:
-                run_job(db, job)
+            pool_broken = False
+
+            # Fill free pool slots
+            while len(in_flight) < concurrency:
+                busy = {aid for _, aid in in_flight.values()}
+                job = _claim_one_job(db, models, args.max_attempts, busy)
+                if not job:
+                    break
+                try:
+                    fut = executor.submit(_run_job_in_child, job.id, args.max_attempts)
+                except BrokenProcessPool:
+                    # A child died (e.g. OOM) and took the pool down; the
+                    # in-flight futures fail below and the pool is rebuilt
+                    _requeue_unstarted(db, job)
+                    pool_broken = True
+                    break
+                in_flight[fut] = (job.id, job.artifact_id)
+
+            if not in_flight and not pool_broken:
+                time.sleep(args.poll_seconds)
+                continue
 
-                job.status = "done"
-                job.finished_at = _utcnow()
-                job.updated_at = _utcnow()
-                job.last_error = None
-                db.commit()
-            except Exception as e:
-                job.last_error = str(e)[:2000]
-                job.updated_at = _utcnow()
-                job.status = "failed" if job.attempts >= args.max_attempts else "queued"
-                db.commit()
+            done, _ = wait(list(in_flight), timeout=args.poll_seconds, return_when=FIRST_COMPLETED)
+            for fut in done:
+                pool_broken |= _settle(db, fut)
+
+            if pool_broken:
+                # A broken pool fails all of its futures; record them before
+                # starting fresh children for the next claims
+                for fut in wait(list(in_flight)).done:
+                    _settle(db, fut)
+                print("worker pool broke (child process died); restarting it", flush=True)
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = _new_executor(concurrency)
         finally:
             db.close()
 
+    if executor is not None:
+        executor.shutdown(wait=True)
+
     print("worker stopped")
     sys.exit(0)
 
@@ -0,0 +1,82 @@
+# backend/tests/test_archive.py
+import io
+import zipfile
+
+
+def _zip_bytes() -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("notes/site.txt", "substation on the north side")
+        zf.writestr("plan.pdf", b"%PDF-1.4 not really")
+        zf.writestr(".DS_Store", b"junk")  # hidden: skipped
+        zf.writestr("empty.txt", b"")  # empty: skipped
+        zf.writestr("../escape.txt", b"nope")  # zip-slip: skipped
+    return buf.getvalue()
+
+
+def test_ingest_zip_unpacks_members_once(client):
+    from backend.app import models
+    from backend.app.db import SessionLocal
+    from backend.app.processors.archive import ingest_zip
+    from backend.app.services.ingest import guess_kind
+    from backend.app.services.storage import build_artifact_path, to_artifact_url, write_stream
+
+    db = SessionLocal()
+    try:
+        park = models.IndustrialPark(name="Zip Park")
+        db.add(park)
+        db.flush()
+        building = models.Building(industrial_park_id=park.id, name="Zip Building")
+        db.add(building)
+        db.flush()
+
+        archive = models.Artifact(
+            industrial_park_id=park.id,
+            building_id=building.id,
+            kind=guess_kind("application/zip", "site.zip"),
+            mime_type="application/zip",
+            original_filename="site.zip",
+            storage_path="PENDING",
+        )
+        db.add(archive)
+        db.flush()
+        path = build_artifact_path(archive.id, "site.zip")
+        size, sha = write_stream(io.BytesIO(_zip_bytes()), path)
+        archive.storage_path = to_artifact_url(path)
+        archive.bytes_size = size
+        archive.sha256 = sha
+        db.commit()
+        assert archive.kind == "archive"
+
+        def members():
+            return (
+                db.query(models.Artifact)
+                .filter(
+                    models.Artifact.building_id == building.id,
+                    models.Artifact.id != archive.id,
+                )
+                .order_by(models.Artifact.id)
+                .all()
+            )
+
+        ingest_zip(db, archive)
+        unpacked = members()
+        assert [(a.original_filename, a.kind) for a in unpacked] == [
+            ("site.txt", "file"),
+            ("plan.pdf", "pdf"),
+        ]
+        assert all(a.storage_path.startswith("/artifact-files/") and a.sha256 for a in unpacked)
+        assert archive.unpacked_sha256 == archive.sha256
+
+        jobs = (
+            db.query(models.ProcessingJob.job_type)
+            .filter(models.ProcessingJob.artifact_id.in_([a.id for a in unpacked]))
+            .all()
+        )
+        assert sorted(jt for (jt,) in jobs) == ["extract_text", "extract_text"]
+
+        # A retried job must not create the members again
+        ingest_zip(db, archive)
+        assert [a.id for a in members()] == [a.id for a in unpacked]
+    finally:
+        db.close()
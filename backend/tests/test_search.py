@@ -0,0 +1,204 @@
+# backend/tests/test_search.py
+import itertools
+
+import pytest
+
+
+def _make_building(name: str):
+    from backend.app import models
+    from backend.app.db import SessionLocal
+
+    db = SessionLocal()
+    park = models.IndustrialPark(name=f"{name} park")
+    db.add(park)
+    db.flush()
+    building = models.Building(industrial_park_id=park.id, name=name)
+    db.add(building)
+    db.flush()
+    artifact = models.Artifact(
+        industrial_park_id=park.id, building_id=building.id, kind="text", text_content=name
+    )
+    db.add(artifact)
+    db.flush()
+    return db, building, artifact
+
+
+# value_json shapes the extractors and older rows produce
+CLAIM_VALUES = [
+    "12.47",
+    "13",
+    "12",
+    "0",
+    "1",
+    '"12.47"',
+    '"yes"',
+    "true",
+    "false",
+    "null",
+    '{"value": 12.47, "unit": "kV"}',
+    '{"value": "yes"}',
+    '{"value": true}',
+    '{"value": null}',
+    '{"unit": "kV"}',
+    "[1, 2]",
+    "not json",
+]
+
+MUST_TARGETS = [12.47, 13, 12, "12.47", "yes", "not json", True, False, 1, 0, None]
+RANGE_OPS = ["<", "<=", ">", ">="]
+RANGE_VALUES = [12.47, 12, "12.5", 0]
+
+
+def _filters():
+    for target in MUST_TARGETS:
+        yield {"must": [{"key": "k", "op": "=", "value": target}]}
+    for op, value in itertools.product(RANGE_OPS, RANGE_VALUES):
+        yield {"range": [{"key": "k", "op": op, "value": value}]}
+    yield {"must": [{"key": "k", "op": "~", "value": 12.5}]}
+    yield {
+        "must": [{"key": "k", "op": "=", "value": "yes"}],
+        "range": [{"key": "other", "op": ">=", "value": 1}],
+    }
+
+
+@pytest.fixture(scope="module")
+def claim_building(client):
+    from backend.app import models
+
+    db, building, artifact = _make_building("claim parity")
+    for i, (key, vj) in enumerate(itertools.product(["k", "other"], CLAIM_VALUES)):
+        db.add(
+            models.Claim(
+                artifact_id=artifact.id,
+                building_id=building.id,
+                field_key=key,
+                value_json=vj,
+                confidence=1.0 - i / 100,
+            )
+        )
+    building_id = building.id
+    db.commit()
+    db.close()
+    return building_id
+
+
+@pytest.mark.parametrize("filt", list(_filters()), ids=repr)
+def test_claim_filter_pushdown_matches_python(client, claim_building, monkeypatch, filt):
+    """The SQL pre-filter must return exactly what the Python check alone returns."""
+    from backend.app.routes import search
+
+    monkeypatch.setattr(search, "_nl_query_to_filters", lambda q: filt)
+
+    def claims():
+        r = client.get("/search", params={"q": "nl query", "mode": "nl", "building_id": claim_building, "limit": 200})
+        assert r.status_code == 200
+        return r.json()["claims"]
+
+    pushed_down = claims()
+    monkeypatch.setattr(search, "_claim_filter_clauses", lambda f: [])
+    assert pushed_down == claims()
+
+
+def test_keyword_search_limits_and_orders_each_branch(client):
+    from datetime import datetime, timedelta
+
+    from backend.app import models
+
+    db, building, note = _make_building("keyword branches")
+    base = datetime(2024, 1, 1)
+    artifacts = []
+    for i in range(5):
+        art = models.Artifact(
+            industrial_park_id=building.industrial_park_id,
+            building_id=building.id,
+            kind="pdf",
+            original_filename=f"zqkw-{i}.pdf",
+            created_at=base + timedelta(days=(i * 3) % 5),
+        )
+        db.add(art)
+        db.flush()
+        artifacts.append(art)
+        db.add(models.ArtifactTextSegment(artifact_id=art.id, segment_index=0, source_ref="p1", text=f"zqkw page {i}"))
+    for i, conf in enumerate([0.2, 0.9, 0.5, 0.7, 0.1]):
+        db.add(
+            models.Claim(
+                artifact_id=note.id,
+                building_id=building.id,
+                field_key=f"zqkw_{i}",
+                value_json='{"value": %d}' % i,
+                confidence=conf,
+            )
+        )
+    building_id = building.id
+    expected_artifacts = [
+        a.original_filename for a in sorted(artifacts, key=lambda a: a.created_at, reverse=True)
+    ][:3]
+    artifact_ids = {a.id for a in artifacts}
+    db.commit()
+    db.close()
+
+    r = client.get("/search", params={"q": "ZQKW", "building_id": building_id, "limit": 3})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["mode"] == "kw"
+
+    # Each branch is limited on its own, in its own order
+    assert [a["filename"] for a in body["artifacts"]] == expected_artifacts
+    assert all(a["building_id"] == building_id and a["kind"] == "pdf" for a in body["artifacts"])
+    assert [(c["field_key"], c["confidence"]) for c in body["claims"]] == [
+        ("zqkw_1", 0.9),
+        ("zqkw_3", 0.7),
+        ("zqkw_2", 0.5),
+    ]
+    assert [c["value"] for c in body["claims"]] == [{"value": 1}, {"value": 3}, {"value": 2}]
+    assert len(body["segments"]) == 3
+    assert all(
+        s["artifact_id"] in artifact_ids and s["segment_index"] == 0 and s["snippet"].startswith("zqkw page")
+        for s in body["segments"]
+    )
+
+
+def test_contains_pattern_escapes_like_wildcards():
+    from backend.app.routes.ui import _contains_pattern
+
+    assert _contains_pattern("substation") == ("%substation%", None)
+    assert _contains_pattern("50%") == ("%50\\%%", "\\")
+    assert _contains_pattern("a_b") == ("%a\\_b%", "\\")
+    assert _contains_pattern("c:\\x") == ("%c:\\\\x%", "\\")
+
+
+def test_ui_search_matches_wildcards_literally(client):
+    from backend.app import models
+
+    db, building, _ = _make_building("literal wildcards")
+    for name, text in [
+        ("load 50% plan.pdf", "feeder at 50% load"),
+        ("load 500 plan.pdf", "feeder at 500 amps"),
+        ("tx_a.pdf", "unit tx_a online"),
+        ("txba.pdf", "unit txba online"),
+    ]:
+        art = models.Artifact(
+            industrial_park_id=building.industrial_park_id,
+            building_id=building.id,
+            kind="pdf",
+            original_filename=name,
+        )
+        db.add(art)
+        db.flush()
+        db.add(models.ArtifactTextSegment(artifact_id=art.id, segment_index=0, source_ref="p1", text=text))
+    building_id = building.id
+    db.commit()
+    db.close()
+
+    def search(q: str) -> str:
+        r = client.get("/ui/search", params={"q": q, "building_id": building_id})
+        assert r.status_code == 200
+        return r.text
+
+    page = search("50%")
+    assert "load 50% plan.pdf" in page and "feeder at <mark>50%</mark> load" in page
+    assert "load 500 plan.pdf" not in page and "500 amps" not in page
+
+    page = search("tx_a")
+    assert "tx_a.pdf" in page and "<mark>tx_a</mark>" in page
+    assert "txba" not in page